@@ -0,0 +1,4 @@
+# benchmark/__init__.py
+#
+# Load-testing and latency benchmarks for the clinical, ECG and chatbot services.
+# Run from the api directory, e.g. `python -m benchmark.load_test --service all`.
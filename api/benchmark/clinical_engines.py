@@ -0,0 +1,129 @@
+# benchmark/clinical_engines.py
+#
+# Side-by-side report of the clinical CNN and the NumPy-only tabular model:
+# test accuracy, ROC AUC, single-row latency, batch throughput and memory.
+# The tabular model is measured first, before TensorFlow is imported, so its
+# RSS figure reflects serving it without TensorFlow.
+#
+#   python -m benchmark.clinical_engines --tabular clinical_tabular_model.npz
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import psutil
+import joblib
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from clinical_features import feature_names, to_cnn_input, DATASET_PATH, TARGET_COLUMN
+from tabular_model import TabularModel
+
+def load_test_split():
+    """Same preprocessing and split as the training scripts"""
+    df = pd.read_excel(DATASET_PATH)
+    for col in feature_names:
+        df[col] = df[col].fillna(df[col].mean())
+    X = df[feature_names].to_numpy(dtype=np.float64)
+    y = df[TARGET_COLUMN].to_numpy()
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return X_test, y_test
+
+def measure(name, load, predict_batch, predict_row, X_test, y_test, batch_rows, batch_size, row_calls):
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    model = load()
+    load_seconds = time.perf_counter() - start
+    rss_after = process.memory_info().rss
+
+    probabilities = predict_batch(model, X_test)
+    predicted = (probabilities >= 0.5).astype(int)
+
+    # Single-row latency, as served per request
+    predict_row(model, X_test[:1])
+    latencies = []
+    for i in range(row_calls):
+        row = X_test[i % len(X_test)].reshape(1, -1)
+        t = time.perf_counter()
+        predict_row(model, row)
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies = np.array(latencies)
+
+    # Batch throughput on the test rows tiled up to batch_rows
+    X_big = np.resize(X_test, (batch_rows, X_test.shape[1]))
+    t = time.perf_counter()
+    for i in range(0, batch_rows, batch_size):
+        predict_batch(model, X_big[i:i + batch_size])
+    batch_seconds = time.perf_counter() - t
+
+    return model, {
+        'engine': name,
+        'accuracy': round(float(np.mean(predicted == y_test)), 4),
+        'roc_auc': round(float(roc_auc_score(y_test, probabilities)), 4),
+        'load_seconds': round(load_seconds, 3),
+        'row_latency_ms': {
+            'p50': round(float(np.percentile(latencies, 50)), 4),
+            'p99': round(float(np.percentile(latencies, 99)), 4),
+        },
+        'batch_rows_per_second': round(batch_rows / batch_seconds, 1),
+        'rss_increase_mb': round((rss_after - rss_before) / 2**20, 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the clinical CNN with the tabular model')
+    parser.add_argument('--tabular', default='clinical_tabular_model.npz')
+    parser.add_argument('--cnn', default='clinical_cnn_model.keras')
+    parser.add_argument('--scaler', default='clinical_scaler.pkl')
+    parser.add_argument('--row-calls', type=int, default=200)
+    parser.add_argument('--tabular-rows', type=int, default=2_000_000)
+    parser.add_argument('--cnn-rows', type=int, default=50_000)
+    parser.add_argument('--output', default='clinical_engines_report.json')
+    args = parser.parse_args(argv)
+
+    X_test, y_test = load_test_split()
+    results = []
+
+    tabular_model, tabular = measure(
+        'tabular',
+        lambda: TabularModel.load(args.tabular),
+        lambda m, X: m.predict_proba(X),
+        lambda m, X: m.predict_proba(X),
+        X_test, y_test, args.tabular_rows, 1_000_000, args.row_calls)
+    tabular['kind'] = tabular_model.kind
+    tabular['parameter_bytes'] = tabular_model.nbytes
+    results.append(tabular)
+
+    def load_cnn():
+        from tensorflow.keras.models import load_model
+        return load_model(args.cnn), joblib.load(args.scaler)
+
+    def cnn_batch(m, X):
+        model, scaler = m
+        return np.asarray(model.predict_on_batch(to_cnn_input(scaler.transform(X))))[:, 0]
+
+    def cnn_row(m, X):
+        # predict() is what predict_clinical.py calls per request
+        model, scaler = m
+        return model.predict(to_cnn_input(scaler.transform(X)), verbose=0)[:, 0]
+
+    (cnn_model, _), cnn = measure('cnn', load_cnn, cnn_batch, cnn_row, X_test, y_test,
+                  args.cnn_rows, 4096, args.row_calls)
+    cnn['parameter_bytes'] = int(sum(w.nbytes for w in cnn_model.get_weights()))
+    results.append(cnn)
+
+    with open(args.output, 'w') as f:
+        json.dump({'generated': time.strftime('%Y-%m-%dT%H:%M:%S'), 'engines': results}, f, indent=2)
+
+    print(f"{'engine':<10}{'acc':>8}{'auc':>8}{'p50 ms':>10}{'p99 ms':>10}{'rows/s':>14}{'RSS MB':>9}{'params B':>11}")
+    for r in results:
+        print(f"{r['engine']:<10}{r['accuracy']:>8}{r['roc_auc']:>8}{r['row_latency_ms']['p50']:>10}"
+              f"{r['row_latency_ms']['p99']:>10}{r['batch_rows_per_second']:>14}{r['rss_increase_mb']:>9}"
+              f"{r['parameter_bytes']:>11}")
+    print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
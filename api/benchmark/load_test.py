@@ -0,0 +1,357 @@
+# benchmark/load_test.py
+#
+# Drive the prediction services at a fixed concurrency and record throughput,
+# latency percentiles, CPU and RSS. Results are written as JSON and can be
+# compared against a stored baseline.
+#
+#   python -m benchmark.load_test --service all --requests 200 --concurrency 8
+#   python -m benchmark.load_test --service ecg --mode subprocess --baseline benchmark/baseline.json
+#   python -m benchmark.load_test --service clinical --logging compare
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import psutil
+import requests
+from benchmark.payloads import clinical_payloads, ecg_payloads, chat_payloads
+from structured_logging import set_logging_enabled
+
+# Service module, route and port, as started by the module's __main__ block
+SERVICES = {
+    'clinical': {'module': 'predict_clinical', 'route': '/predict', 'port': 5000},
+    'ecg': {'module': 'predict_image', 'route': '/predict-ecg', 'port': 5001},
+    'chat': {'module': 'chatbot', 'route': '/chat', 'port': 5002},
+    'combined': {'module': 'predict_combined', 'route': '/assess', 'port': 5003},
+}
+
+# Metrics compared against the baseline, and whether higher values are better
+COMPARED_METRICS = {
+    'throughput_rps': True,
+    'latency_ms.p50': False,
+    'latency_ms.p95': False,
+    'latency_ms.p99': False,
+}
+
+def build_payloads(service, count, seed):
+    if service == 'clinical':
+        return clinical_payloads(count, seed=seed)
+    if service == 'ecg':
+        return ecg_payloads()
+    if service == 'combined':
+        images = ecg_payloads()
+        return [{'clinical': form, 'image': images[i % len(images)]['image']}
+                for i, form in enumerate(clinical_payloads(count, seed=seed))]
+    return chat_payloads()
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU time and RSS of a process and its children (e.g. serve.py workers) during a run"""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak_rss = self.rss()
+        self._stop_event = threading.Event()
+
+    def _processes(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return [self.process]
+
+    def rss(self):
+        total = 0
+        for process in self._processes():
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if not self.process.is_running():
+                break
+            self.peak_rss = max(self.peak_rss, self.rss())
+
+    def cpu_seconds(self):
+        total = 0.0
+        for process in self._processes():
+            try:
+                times = process.cpu_times()
+            except psutil.Error:
+                continue
+            total += times.user + times.system
+        return total
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class InProcessTarget:
+    """Calls a service through Flask's test client in this interpreter"""
+
+    def __init__(self, service, logging_enabled=True):
+        spec = SERVICES[service]
+        module = __import__(spec['module'])
+        if service == 'chat':
+            # Keep the chatbot off the OpenAI API so only the local path is measured
+            module.openai.api_key = None
+        self.app = module.app
+        self.route = spec['route']
+        self.pid = os.getpid()
+        self._local = threading.local()
+        set_logging_enabled(logging_enabled)
+
+    def send(self, payload):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.post(self.route, json=payload).status_code
+
+    def close(self):
+        pass
+
+class SubprocessTarget:
+    """Starts a service in its own Python process and calls it over HTTP"""
+
+    def __init__(self, service, logging_enabled=True, port=None, startup_timeout=180, workers=None,
+                 threads=None, pin=False):
+        spec = SERVICES[service]
+        port = port or spec['port']
+        env = dict(os.environ)
+        env['LOG_ENABLED'] = '1' if logging_enabled else '0'
+        if service == 'chat':
+            env['OPENAI_API_KEY'] = ''
+        if workers is None:
+            code = (
+                f"import {spec['module']} as m; "
+                f"m.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"
+            )
+            command = [sys.executable, '-c', code]
+        else:
+            # Several CPU-budgeted workers behind one port, see serve.py
+            command = [sys.executable, 'serve.py', spec['module'], '--host', '127.0.0.1',
+                       '--port', str(port), '--workers', str(workers)]
+            if threads:
+                command += ['--threads', str(threads)]
+            if pin:
+                command.append('--pin')
+        self.proc = subprocess.Popen(command, env=env,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.proc.pid
+        self.url = f"http://127.0.0.1:{port}{spec['route']}"
+        self._session = threading.local()
+        self._wait_for_port(port, startup_timeout)
+
+    def _wait_for_port(self, port, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Service exited during startup with code {self.proc.returncode}")
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        raise TimeoutError(f"Service did not start listening on port {port} within {timeout}s")
+
+    def send(self, payload):
+        session = getattr(self._session, 'session', None)
+        if session is None:
+            session = self._session.session = requests.Session()
+        return session.post(self.url, json=payload, timeout=60).status_code
+
+    def close(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+def run_load(target, payloads, num_requests, concurrency, warmup):
+    """Send num_requests payloads at the given concurrency and summarize the run"""
+    for i in range(warmup):
+        target.send(payloads[i % len(payloads)])
+
+    latencies = np.zeros(num_requests)
+    statuses = [0] * num_requests
+
+    def timed_send(i):
+        start = time.perf_counter()
+        try:
+            statuses[i] = target.send(payloads[i % len(payloads)])
+        except Exception:
+            statuses[i] = -1
+        latencies[i] = time.perf_counter() - start
+
+    sampler = ResourceSampler(target.pid)
+    cpu_start = sampler.cpu_seconds()
+    sampler.start()
+    wall_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_send, range(num_requests)))
+
+    wall = time.perf_counter() - wall_start
+    cpu = sampler.cpu_seconds() - cpu_start
+    sampler.stop()
+    rss = sampler.rss()
+
+    latencies_ms = latencies * 1000.0
+    return {
+        'requests': num_requests,
+        'concurrency': concurrency,
+        'errors': sum(1 for status in statuses if status != 200),
+        'wall_seconds': round(wall, 4),
+        'throughput_rps': round(num_requests / wall, 2),
+        'latency_ms': {
+            'mean': round(float(latencies_ms.mean()), 3),
+            'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+            'p95': round(float(np.percentile(latencies_ms, 95)), 3),
+            'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+            'max': round(float(latencies_ms.max()), 3),
+        },
+        'cpu_seconds': round(cpu, 3),
+        'cpu_percent': round(100.0 * cpu / wall, 1),
+        'rss_mb': round(rss / 2**20, 1),
+        'peak_rss_mb': round(sampler.peak_rss / 2**20, 1),
+    }
+
+def _metric(result, dotted):
+    value = result
+    for key in dotted.split('.'):
+        value = value[key]
+    return value
+
+def services_without_baseline(results, baseline):
+    """Services in results that the baseline has no numbers for, so can't be compared"""
+    return [service for service in results['services'] if service not in baseline.get('services', {})]
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Return a list of regressions larger than threshold (a fraction) versus the
+    baseline. Services missing from the baseline are skipped; see
+    services_without_baseline.
+    """
+    regressions = []
+    for service, result in results['services'].items():
+        if service not in baseline.get('services', {}):
+            continue
+        base = baseline['services'][service]
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = _metric(base, metric), _metric(result, metric)
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append({
+                    'service': service,
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change_percent': round(change * 100, 1),
+                })
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the GDM prediction services')
+    parser.add_argument('--service', choices=list(SERVICES) + ['all'], default='all')
+    parser.add_argument('--mode', choices=['inprocess', 'subprocess'], default='inprocess')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per service')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests sent first')
+    parser.add_argument('--logging', choices=['on', 'off', 'compare'], default='on',
+                        help='Run with service logging on, off, or once each for comparison')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic clinical rows')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed relative regression before failing (0.10 = 10%%)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to --baseline instead of comparing')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    services = list(SERVICES) if args.service == 'all' else [args.service]
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'mode': args.mode,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'services': {},
+    }
+
+    if args.logging == 'compare':
+        passes = [('logging=on', True), ('logging=off', False)]
+    else:
+        passes = [(None, args.logging == 'on')]
+
+    for service in services:
+        payloads = build_payloads(service, max(args.requests, 1), args.seed)
+        for label, logging_enabled in passes:
+            name = f"{service}[{label}]" if label else service
+            if args.mode == 'inprocess':
+                target = InProcessTarget(service, logging_enabled)
+            else:
+                target = SubprocessTarget(service, logging_enabled)
+            try:
+                result = run_load(target, payloads, args.requests, args.concurrency, args.warmup)
+            finally:
+                target.close()
+            result['logging'] = logging_enabled
+            results['services'][name] = result
+            print(f"{name}: {result['throughput_rps']} req/s, "
+                  f"p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+                  f"p99 {result['latency_ms']['p99']} ms, errors {result['errors']}")
+
+        if args.logging == 'compare':
+            on = results['services'][f"{service}[logging=on]"]['throughput_rps']
+            off = results['services'][f"{service}[logging=off]"]['throughput_rps']
+            print(f"{service}: logging costs {100.0 * (off - on) / off:.1f}% of throughput")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated at {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        missing = services_without_baseline(results, baseline)
+        for service in missing:
+            print(f"NO BASELINE {service}: not in {args.baseline}, not compared "
+                  f"(rerun with --update-baseline to add it)")
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['service']} {r['metric']}: {r['baseline']} -> {r['current']} "
+                  f"({r['change_percent']:+}%)")
+        if regressions:
+            return 1
+        compared = [service for service in results['services'] if service not in missing]
+        if compared:
+            print(f"No regressions beyond {args.threshold:.0%} against {args.baseline} "
+                  f"for {', '.join(compared)}")
+        else:
+            print(f"No services compared: none of them are in {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
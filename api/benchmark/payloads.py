@@ -0,0 +1,68 @@
+# benchmark/payloads.py
+
+import os
+import base64
+import random
+import pandas as pd
+from clinical_features import (
+    form_to_feature_mapping, yes_no_fields, DATASET_PATH, ID_COLUMN, TARGET_COLUMN
+)
+
+ECG_TEST_DIR = os.path.join('dataset', 'test')
+IMAGE_EXTENSIONS = ('.bmp', '.jpg', '.jpeg', '.png')
+
+# Questions answered from the chatbot knowledge base, so no upstream call is made
+CHAT_QUESTIONS = [
+    "What is GDM?",
+    "What are the GDM risk factors?",
+    "How is GDM diagnosed?",
+    "What is the GDM treatment?",
+    "What should a GDM diet look like?",
+    "What are the GDM complications?",
+]
+
+def clinical_feature_ranges(file_path=DATASET_PATH):
+    """Return {feature: (min, max)} observed in the clinical dataset"""
+    df = pd.read_excel(file_path).drop(columns=[ID_COLUMN, TARGET_COLUMN])
+    return {col: (float(df[col].min()), float(df[col].max())) for col in df.columns}
+
+def clinical_payloads(count, seed=0, file_path=DATASET_PATH):
+    """Generate synthetic clinical form submissions within the dataset's feature ranges"""
+    rng = random.Random(seed)
+    ranges = clinical_feature_ranges(file_path)
+    payloads = []
+
+    for _ in range(count):
+        payload = {}
+        for form_field, feature in form_to_feature_mapping.items():
+            low, high = ranges[feature]
+            if form_field in yes_no_fields:
+                payload[form_field] = rng.choice(['yes', 'no'])
+            elif form_field == 'physicalActivity':
+                payload[form_field] = rng.choice(['low', 'medium', 'high'])
+            elif low.is_integer() and high.is_integer():
+                payload[form_field] = str(rng.randint(int(low), int(high)))
+            else:
+                payload[form_field] = f"{rng.uniform(low, high):.1f}"
+        payloads.append(payload)
+
+    return payloads
+
+def ecg_payloads(test_dir=ECG_TEST_DIR):
+    """Encode every ECG image in the test split as a base64 data URL payload"""
+    payloads = []
+    for root, _, files in os.walk(test_dir):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                encoded = base64.b64encode(f.read()).decode('ascii')
+            payloads.append({'image': f"data:image/{name.rsplit('.', 1)[1]};base64,{encoded}"})
+
+    if not payloads:
+        raise FileNotFoundError(f"No ECG images found under {test_dir}")
+    return payloads
+
+def chat_payloads():
+    """Chat messages that resolve locally from the knowledge base"""
+    return [{'message': question} for question in CHAT_QUESTIONS]
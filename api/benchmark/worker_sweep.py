@@ -0,0 +1,112 @@
+# benchmark/worker_sweep.py
+#
+# Sweep workers x threads-per-worker splits of the CPU budget for the ECG and
+# clinical services and report throughput and tail latency for each. Every
+# split runs serve.py in subprocesses and is driven over HTTP like the load
+# test. For comparison each multi-worker split is also run "unbudgeted", with
+# every worker sized to the whole budget as TensorFlow does by default.
+#
+#   python -m benchmark.worker_sweep --service ecg --requests 200 --concurrency 16
+#   python -m benchmark.worker_sweep --service all --pin --output worker_sweep_report.json
+
+import sys
+import json
+import time
+import argparse
+import requests
+from benchmark.load_test import SubprocessTarget, build_payloads, run_load
+from worker_config import cpu_budget, candidate_splits
+
+SWEPT_SERVICES = ('ecg', 'clinical')
+
+def sweep_configs(budget, pin, include_unbudgeted=True):
+    """(workers, threads, pin) for every split of the budget, plus the oversubscribed defaults"""
+    configs = [(workers, threads, pin) for workers, threads in candidate_splits(budget)]
+    if include_unbudgeted:
+        configs += [(workers, budget, False) for workers, _ in candidate_splits(budget) if workers > 1]
+    return configs
+
+def wait_for_workers(port, workers, timeout=180):
+    """Poll /health on fresh connections until every worker has answered healthy once"""
+    seen = set()
+    deadline = time.time() + timeout
+    while len(seen) < workers and time.time() < deadline:
+        index = None
+        try:
+            response = requests.get(f"http://127.0.0.1:{port}/health", timeout=5,
+                                    headers={'Connection': 'close'})
+            if response.status_code == 200:
+                index = response.json().get('worker', {}).get('worker_index')
+        except (requests.RequestException, ValueError):
+            pass
+        if index is None:
+            time.sleep(0.2)  # not up yet, or its model is still loading
+        else:
+            seen.add(index)
+    return len(seen) >= workers
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep worker/thread splits of the CPU budget')
+    parser.add_argument('--service', choices=list(SWEPT_SERVICES) + ['all'], default='all')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--pin', action='store_true', help='Pin workers to their cores in budgeted splits')
+    parser.add_argument('--budget', type=int, help='Cores to split (default: detected)')
+    parser.add_argument('--no-unbudgeted', action='store_true', help='Skip the oversubscribed comparison runs')
+    parser.add_argument('--port', type=int, default=5100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='worker_sweep_report.json')
+    args = parser.parse_args(argv)
+
+    cores, detected = cpu_budget()
+    budget = args.budget or detected
+    services = list(SWEPT_SERVICES) if args.service == 'all' else [args.service]
+    report = {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cores_available': len(cores),
+        'cpu_budget': budget,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'services': {},
+    }
+
+    for service in services:
+        payloads = build_payloads(service, max(args.requests, 1), args.seed)
+        runs = []
+        for workers, threads, pin in sweep_configs(budget, args.pin, not args.no_unbudgeted):
+            label = f"{workers}x{threads}{' pinned' if pin else ''}"
+            print(f"[{service}] {label} ...", flush=True)
+            target = SubprocessTarget(service, logging_enabled=False, port=args.port,
+                                      workers=workers, threads=threads, pin=pin)
+            try:
+                if not wait_for_workers(args.port, workers):
+                    print(f"[{service}] {label}: not every worker came up, results may be skewed")
+                result = run_load(target, payloads, args.requests, args.concurrency, args.warmup)
+            finally:
+                target.close()
+            result.update({'workers': workers, 'threads_per_worker': threads, 'pinned': pin,
+                           'oversubscribed': workers * threads > budget})
+            runs.append(result)
+        report['services'][service] = runs
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nCPU budget {budget} of {len(cores)} cores, {args.requests} requests at concurrency {args.concurrency}")
+    print(f"{'service':<10}{'split':<16}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}{'cpu %':>8}{'RSS MB':>9}{'errors':>8}")
+    for service, runs in report['services'].items():
+        for r in runs:
+            split = f"{r['workers']}x{r['threads_per_worker']}" + (' pin' if r['pinned'] else '') \
+                + (' over' if r['oversubscribed'] else '')
+            print(f"{service:<10}{split:<16}{r['throughput_rps']:>9}{r['latency_ms']['p50']:>10}"
+                  f"{r['latency_ms']['p99']:>10}{r['cpu_percent']:>8}{r['peak_rss_mb']:>9}{r['errors']:>8}")
+        best = max((r for r in runs if not r['errors']), key=lambda r: r['throughput_rps'], default=None)
+        if best is not None:
+            print(f"{service}: highest throughput with {best['workers']} workers x "
+                  f"{best['threads_per_worker']} threads (p99 {best['latency_ms']['p99']} ms)")
+    print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
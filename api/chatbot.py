@@ -1,20 +1,17 @@
 
 import os
 import json
-import logging
 import openai
 import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from structured_logging import configure_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger('gdm-chatbot')
+logger = configure_logging('gdm-chatbot')
+ROUTE = '/chat'
 
 # Load environment variables
 load_dotenv()
@@ -107,11 +104,11 @@ def chat():
         data = request.json
         
         if 'message' not in data:
-            logger.warning("Chat request missing message")
+            logger.warning("Chat request missing message", extra={'route': ROUTE})
             return jsonify({'error': 'No message provided'}), 400
             
         user_message = data['message']
-        logger.info(f"Received chat request: {user_message[:50]}...")
+        logger.info(f"Received chat request: {user_message[:50]}...", extra={'route': ROUTE})
         
         # Check if OpenAI API is available
         if openai.api_key:
@@ -140,14 +137,14 @@ def chat():
                 
                 # Extract and return the assistant's response
                 assistant_response = response.choices[0].message.content
-                logger.info(f"Generated response: {assistant_response[:50]}...")
+                logger.info(f"Generated response: {assistant_response[:50]}...", extra={'route': ROUTE})
                 
                 return jsonify({
                     'response': assistant_response,
                     'source': 'api'
                 })
             except Exception as e:
-                logger.warning(f"OpenAI API error, falling back to web scraping: {str(e)}")
+                logger.warning(f"OpenAI API error, falling back to web scraping: {str(e)}", extra={'route': ROUTE})
                 # Fall back to web scraping if OpenAI API fails
                 scraped_response = web_scrape_for_gdm_info(user_message)
                 return jsonify({
@@ -156,7 +153,7 @@ def chat():
                 })
         else:
             # If API key is not configured, use web scraping
-            logger.info("API key not found, using web scraping fallback")
+            logger.info("API key not found, using web scraping fallback", extra={'route': ROUTE})
             scraped_response = web_scrape_for_gdm_info(user_message)
             return jsonify({
                 'response': scraped_response,
@@ -164,7 +161,7 @@ def chat():
             })
         
     except Exception as e:
-        logger.error(f"Chat error: {str(e)}", exc_info=True)
+        logger.error(f"Chat error: {str(e)}", exc_info=True, extra={'route': ROUTE})
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
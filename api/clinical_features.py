@@ -0,0 +1,52 @@
+# clinical_features.py
+#
+# Clinical feature table shared by the prediction service and tooling that
+# needs to build or interpret clinical requests without loading the model.
+
+import numpy as np
+
+# Input feature names, in the column order of the training dataset
+feature_names = [
+    'Age', 'No of Pregnancy', 'Gestation in previous Pregnancy', 'BMI', 'HDL', 'Family History',
+    'unexplained prenetal loss', 'Large Child or Birth Default', 'PCOS', 'Sys BP', 'Dia BP',
+    'OGTT', 'Hemoglobin', 'Sedentary Lifestyle', 'Prediabetes'
+]
+
+# Mapping from form fields to feature names
+form_to_feature_mapping = {
+    'age': 'Age',
+    'pregnancyCount': 'No of Pregnancy',
+    'previousGestationPeriod': 'Gestation in previous Pregnancy',
+    'bmi': 'BMI',
+    'hdl': 'HDL',
+    'familyHistory': 'Family History',  # yes=1, no=0
+    'prenatalLoss': 'unexplained prenetal loss',  # yes=1, no=0
+    'birthDefects': 'Large Child or Birth Default',  # yes=1, no=0
+    'pcos': 'PCOS',  # yes=1, no=0
+    'systolicBP': 'Sys BP',
+    'diastolicBP': 'Dia BP',
+    'glucoseLevels': 'OGTT',
+    'hemoglobin': 'Hemoglobin',
+    'physicalActivity': 'Sedentary Lifestyle',  # low=1, medium/high=0
+    'prediabetes': 'Prediabetes'  # yes=1, no=0
+}
+
+# Form fields answered with 'yes'/'no'
+yes_no_fields = ['familyHistory', 'prenatalLoss', 'birthDefects', 'pcos', 'prediabetes']
+
+# Dataset file and its non-feature columns
+DATASET_PATH = 'clinical_data/Gestational Diabetic Dataset.xlsx'
+ID_COLUMN = 'Case Number'
+TARGET_COLUMN = 'Class Label(GDM /Non GDM)'
+
+def to_cnn_input(X_scaled):
+    """Zero-pad scaled feature rows into the square single-channel images the clinical CNN expects"""
+    num_features = X_scaled.shape[1]
+    image_size = int(np.ceil(np.sqrt(num_features)))
+    if image_size < 8:
+        image_size = 8
+
+    padded = np.zeros((X_scaled.shape[0], image_size**2))
+    padded[:, :num_features] = X_scaled
+
+    return padded.reshape(-1, image_size, image_size, 1).astype(np.float32)
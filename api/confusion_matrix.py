@@ -1,32 +1,36 @@
+# confusion_matrix.py
+#
+# Render confusion matrices from an evaluation report written by evaluate.py.
+#
+#   python confusion_matrix.py evaluation_report.json
+
 import os
-import matplotlib.pyplot as plt
+import sys
+import json
+import argparse
 import numpy as np
-from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score
-
-# Create images folder if not exists
-os.makedirs('images', exist_ok=True)
-
-# Clinical Data
-y_true_clinical = [0]*350 + [1]*355
-y_pred_clinical = [0]*340 + [1]*10 + [0]*11 + [1]*344
-
-# ECG Data
-y_true_ecg = [0]*4 + [1]*4
-y_pred_ecg = [0]*3 + [1]*1 + [1]*4
 
-# Compute confusion matrices
-cm_clinical = confusion_matrix(y_true_clinical, y_pred_clinical)
-cm_ecg = confusion_matrix(y_true_ecg, y_pred_ecg)
+TITLES = {
+    'clinical': "Clinical Data Confusion Matrix",
+    'ecg': "ECG Data Confusion Matrix",
+}
 
 # Function to plot confusion matrix
-def plot_confusion_matrix(cm, title, filename, class_labels=["GDM", "Non-GDM"]):
+def plot_confusion_matrix(cm, title, filename, class_labels=["GDM", "Non-GDM"], dpi=150):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    cm = np.asarray(cm)
     fig, ax = plt.subplots(figsize=(5,4))
     cax = ax.matshow(cm, cmap="Blues")
     plt.title(title, pad=20)
     fig.colorbar(cax)
 
-    ax.set_xticklabels([''] + class_labels)
-    ax.set_yticklabels([''] + class_labels)
+    ax.set_xticks(range(len(class_labels)))
+    ax.set_yticks(range(len(class_labels)))
+    ax.set_xticklabels(class_labels)
+    ax.set_yticklabels(class_labels)
 
     plt.xlabel('Predicted')
     plt.ylabel('True')
@@ -36,30 +40,25 @@ def plot_confusion_matrix(cm, title, filename, class_labels=["GDM", "Non-GDM"]):
         ax.text(j, i, f"{val}", ha='center', va='center', color='black', fontsize=12)
 
     plt.tight_layout()
-    plt.savefig(filename, dpi=300)
-    plt.close()
-
-# Plot clinical confusion matrix
-plot_confusion_matrix(cm_clinical, "Clinical Data Confusion Matrix", "images/clinical_confusion_matrix.png")
-
-# Plot ECG confusion matrix
-plot_confusion_matrix(cm_ecg, "ECG Data Confusion Matrix", "images/ecg_confusion_matrix.png")
-
-# Calculate Precision, Recall, F1
-clinical_precision = precision_score(y_true_clinical, y_pred_clinical)
-clinical_recall = recall_score(y_true_clinical, y_pred_clinical)
-clinical_f1 = f1_score(y_true_clinical, y_pred_clinical)
+    plt.savefig(filename, dpi=dpi)
+    plt.close(fig)
 
-ecg_precision = precision_score(y_true_ecg, y_pred_ecg)
-ecg_recall = recall_score(y_true_ecg, y_pred_ecg)
-ecg_f1 = f1_score(y_true_ecg, y_pred_ecg)
+def plot_report(report, output_dir='images', dpi=150):
+    """Plot a confusion matrix for every task in an evaluation report"""
+    os.makedirs(output_dir, exist_ok=True)
+    for task, result in report['tasks'].items():
+        filename = os.path.join(output_dir, f"{task}_confusion_matrix.png")
+        plot_confusion_matrix(result['confusion_matrix'], TITLES.get(task, task),
+                              filename, class_labels=result['labels'], dpi=dpi)
+        print(f"Saved {filename}")
 
-print("=== Clinical Model Metrics ===")
-print(f"Precision: {clinical_precision:.2f}")
-print(f"Recall: {clinical_recall:.2f}")
-print(f"F1-Score: {clinical_f1:.2f}")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot confusion matrices from an evaluation report')
+    parser.add_argument('report', nargs='?', default='evaluation_report.json')
+    parser.add_argument('--output-dir', default='images')
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args()
 
-print("\n=== ECG Model Metrics ===")
-print(f"Precision: {ecg_precision:.2f}")
-print(f"Recall: {ecg_recall:.2f}")
-print(f"F1-Score: {ecg_f1:.2f}")
+    with open(args.report) as f:
+        plot_report(json.load(f), args.output_dir, args.dpi)
+    sys.exit(0)
@@ -0,0 +1,425 @@
+# ecg_jobs.py
+#
+# Asynchronous bulk scoring of ECG images from a zip archive or a server-side
+# directory. A job runner thread streams the images in a fixed order, decodes
+# them on a thread pool, scores them in batches and appends the results to
+# CSV or Parquet. Progress is checkpointed in SQLite after every flush, so a
+# restarted service resumes unfinished jobs from the last checkpoint instead of
+# starting over.
+#
+# Environment variables:
+#   ECG_JOBS_DIR         where job inputs, outputs and the SQLite store live (default 'ecg_jobs')
+#   ECG_JOB_ROOTS        comma-separated directories clients may submit (default 'dataset')
+#   ECG_JOB_BATCH_SIZE   images per inference batch (default 64)
+#   ECG_JOB_WORKERS      image decode threads (default 4)
+#   ECG_JOB_MAX_UPLOAD_MB      largest zip upload accepted (default 512)
+#   ECG_JOB_MAX_IMAGES         most images in one zip archive (default 100000)
+#   ECG_JOB_MAX_UNZIPPED_MB    largest total uncompressed image size in a zip (default 4096)
+#
+# Every /jobs route needs admin access (see model_registry.admin_authorized).
+
+import os
+import csv
+import shutil
+import time
+import uuid
+import contextlib
+import queue
+import itertools
+import sqlite3
+import logging
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import request, jsonify, send_file
+
+logger = logging.getLogger('ecg-jobs')
+
+IMAGE_EXTENSIONS = ('.bmp', '.jpg', '.jpeg', '.png')
+RESULT_COLUMNS = ['name', 'prediction', 'is_diabetic', 'confidence', 'raw_prediction',
+                  'model_version', 'error']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    source_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    format TEXT NOT NULL,
+    output TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    output_bytes INTEGER NOT NULL DEFAULT 0,
+    parts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    run_started REAL,
+    run_done_at_start INTEGER
+);
+"""
+
+# Columns added after the first release, for job stores created before them
+ADDED_COLUMNS = {'run_started': 'REAL', 'run_done_at_start': 'INTEGER'}
+
+def _parquet_module():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+class ImageSource:
+    """Lists and reads images from a zip archive or a directory, in a stable order"""
+
+    def __init__(self, source_type, source):
+        self.source_type = source_type
+        self.source = source
+        if source_type == 'zip':
+            with zipfile.ZipFile(source) as archive:
+                names = [n for n in archive.namelist()
+                         if n.lower().endswith(IMAGE_EXTENSIONS) and not n.endswith('/')]
+        else:
+            names = []
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                names.extend(os.path.relpath(os.path.join(root, f), source)
+                             for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.names = sorted(names)
+
+    def read(self, start):
+        """Yield (name, bytes) from position start onwards"""
+        if self.source_type == 'zip':
+            with zipfile.ZipFile(self.source) as archive:
+                for name in self.names[start:]:
+                    yield name, archive.read(name)
+        else:
+            for name in self.names[start:]:
+                with open(os.path.join(self.source, name), 'rb') as f:
+                    yield name, f.read()
+
+class JobStore:
+    """SQLite job table; every method opens its own connection so any thread may call it"""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            existing = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, job):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, source_type, source, format, output, status, created) "
+                "VALUES (:id, :source_type, :source, :format, :output, 'queued', :created)", job)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit=50):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def unfinished(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status IN ('queued', 'running') "
+                                "ORDER BY created").fetchall()
+        return [row['id'] for row in rows]
+
+    def update(self, job_id, **fields):
+        assignments = ', '.join(f"{key} = :{key}" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = :id", dict(fields, id=job_id))
+
+class JobManager:
+    """
+    Runs bulk scoring jobs one at a time on a background thread.
+
+    decode_fn(image_bytes) returns one preprocessed image array;
+    predict_fn(images) scores a list of them and returns one dict per image
+    with the RESULT_COLUMNS other than name/error.
+    """
+
+    def __init__(self, decode_fn, predict_fn, jobs_dir=None, allowed_roots=None,
+                 batch_size=None, workers=None, resume=True, max_upload_mb=None, max_images=None,
+                 max_unzipped_mb=None):
+        self.decode_fn = decode_fn
+        self.predict_fn = predict_fn
+        self.jobs_dir = jobs_dir or os.getenv('ECG_JOBS_DIR', 'ecg_jobs')
+        roots = allowed_roots or os.getenv('ECG_JOB_ROOTS', 'dataset').split(',')
+        self.allowed_roots = [os.path.realpath(root.strip()) for root in roots if root.strip()]
+        self.batch_size = batch_size or int(os.getenv('ECG_JOB_BATCH_SIZE', '64'))
+        self.workers = workers or int(os.getenv('ECG_JOB_WORKERS', '4'))
+        self.max_upload_bytes = int(float(max_upload_mb or os.getenv('ECG_JOB_MAX_UPLOAD_MB', '512')) * 2**20)
+        self.max_images = max_images or int(os.getenv('ECG_JOB_MAX_IMAGES', '100000'))
+        self.max_unzipped_bytes = int(float(max_unzipped_mb or os.getenv('ECG_JOB_MAX_UNZIPPED_MB', '4096')) * 2**20)
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.store = JobStore(os.path.join(self.jobs_dir, 'jobs.sqlite'))
+        self._queue = queue.Queue()
+        self._runner = threading.Thread(target=self._run_forever, daemon=True)
+        self._runner.start()
+
+        # Pick up jobs interrupted by a crash or restart
+        for job_id in (self.store.unfinished() if resume else []):
+            logger.info(f"Resuming ECG job {job_id}")
+            self._queue.put(job_id)
+
+    def submit_zip(self, file_storage, fmt='csv'):
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        archive_path = os.path.join(job_dir, 'input.zip')
+        file_storage.save(archive_path)
+        try:
+            self._check_archive(archive_path)
+        except ValueError:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        return self._create(job_id, 'zip', archive_path, fmt)
+
+    def _check_archive(self, archive_path):
+        """Reject non-zips and archives over the image count or uncompressed size limits"""
+        if not zipfile.is_zipfile(archive_path):
+            raise ValueError('Uploaded file is not a zip archive')
+        with zipfile.ZipFile(archive_path) as archive:
+            images = [info for info in archive.infolist()
+                      if info.filename.lower().endswith(IMAGE_EXTENSIONS) and not info.is_dir()]
+        if len(images) > self.max_images:
+            raise ValueError(f'Archive has {len(images)} images, the limit is {self.max_images}')
+        if sum(info.file_size for info in images) > self.max_unzipped_bytes:
+            raise ValueError(f'Archive images exceed {self.max_unzipped_bytes // 2**20} MB uncompressed')
+
+    def submit_directory(self, directory, fmt='csv'):
+        path = os.path.realpath(directory)
+        if not any(path == root or path.startswith(root + os.sep) for root in self.allowed_roots):
+            raise PermissionError('Directory is outside the allowed job roots')
+        if not os.path.isdir(path):
+            raise ValueError(f'Not a directory: {directory}')
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.jobs_dir, job_id))
+        return self._create(job_id, 'directory', path, fmt)
+
+    def _create(self, job_id, source_type, source, fmt):
+        if fmt not in ('csv', 'parquet'):
+            raise ValueError(f'Unsupported output format: {fmt}')
+        if fmt == 'parquet' and _parquet_module() is None:
+            raise ValueError('Parquet output requires pyarrow to be installed')
+        output = os.path.join(self.jobs_dir, job_id, 'results.csv' if fmt == 'csv' else 'results')
+        self.store.create({'id': job_id, 'source_type': source_type, 'source': source,
+                           'format': fmt, 'output': output, 'created': time.time()})
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id):
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        processed = job['done']
+        total = job['total']
+        status = {
+            'id': job['id'],
+            'status': job['status'],
+            'source_type': job['source_type'],
+            'format': job['format'],
+            'total': total,
+            'done': processed,
+            'failed': job['failed'],
+            'progress': round(processed / total, 4) if total else None,
+            'throughput_per_second': None,
+            'eta_seconds': None,
+            'error': job['error'],
+        }
+        # The current run's start is in the job row, so any worker can report its rate
+        if job['status'] == 'running' and job['run_started']:
+            elapsed = time.time() - job['run_started']
+            rate = (processed - job['run_done_at_start']) / elapsed if elapsed > 0 else 0
+            status['throughput_per_second'] = round(rate, 2)
+            if rate > 0 and total:
+                status['eta_seconds'] = round((total - processed) / rate, 1)
+        elif job['started'] and job['finished']:
+            elapsed = job['finished'] - job['started']
+            status['throughput_per_second'] = round(processed / elapsed, 2) if elapsed > 0 else None
+        return status
+
+    def _run_forever(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"ECG job {job_id} failed: {str(e)}", exc_info=True)
+                self.store.update(job_id, status='failed', error=str(e), finished=time.time())
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return
+
+        source = ImageSource(job['source_type'], job['source'])
+        start = job['done']
+        now = time.time()
+        self.store.update(job_id, status='running', total=len(source.names),
+                          started=job['started'] or now, run_started=now, run_done_at_start=start)
+
+        writer = _CsvResults(job['output'], job['output_bytes']) if job['format'] == 'csv' \
+            else _ParquetResults(job['output'], job['parts'])
+        done, failed = start, job['failed']
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ecg-decode') as pool:
+            for names, decoded in self._decoded_batches(source, start, pool):
+                rows = [None] * len(names)
+                good = [i for i, item in enumerate(decoded) if not isinstance(item, Exception)]
+                if good:
+                    for i, row in zip(good, self.predict_fn([decoded[i] for i in good])):
+                        rows[i] = dict(row, name=names[i], error=None)
+                for i, item in enumerate(decoded):
+                    if isinstance(item, Exception):
+                        rows[i] = {'name': names[i], 'error': str(item)}
+                        failed += 1
+
+                done += len(names)
+                # Flush first, then checkpoint, so a crash never loses or repeats rows
+                checkpoint = writer.write(rows)
+                self.store.update(job_id, done=done, failed=failed, **checkpoint)
+
+        writer.close()
+        self.store.update(job_id, status='completed', finished=time.time())
+        logger.info(f"ECG job {job_id} completed: {done} images, {failed} failed")
+
+    def _decoded_batches(self, source, start, pool):
+        """Read images in order and decode them on the pool, one batch ahead of scoring"""
+        def decode(item):
+            try:
+                return self.decode_fn(item[1])
+            except Exception as e:
+                return e
+
+        pending = None
+        items = source.read(start)
+        while True:
+            batch = list(itertools.islice(items, self.batch_size))
+            if not batch:
+                break
+            submitted = ([name for name, _ in batch], pool.map(decode, batch))
+            if pending is not None:
+                yield pending[0], list(pending[1])
+            pending = submitted
+        if pending is not None:
+            yield pending[0], list(pending[1])
+
+class _CsvResults:
+    """Appends rows to a CSV file; truncates to the last checkpoint when resuming"""
+
+    def __init__(self, path, checkpoint_bytes):
+        exists = os.path.exists(path)
+        self.file = open(path, 'a+', newline='')
+        if exists:
+            self.file.truncate(checkpoint_bytes)
+            self.file.seek(checkpoint_bytes)
+        self.writer = csv.DictWriter(self.file, fieldnames=RESULT_COLUMNS)
+        if not exists or checkpoint_bytes == 0:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'output_bytes': self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+class _ParquetResults:
+    """Writes each flush as a new part file; parts after the checkpoint are discarded on resume"""
+
+    def __init__(self, directory, checkpoint_parts):
+        self.pa = _parquet_module()
+        self.directory = directory
+        self.parts = checkpoint_parts
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith('part-') and int(name[5:10]) >= checkpoint_parts:
+                os.remove(os.path.join(directory, name))
+
+    def write(self, rows):
+        table = self.pa.Table.from_pylist(
+            [{column: row.get(column) for column in RESULT_COLUMNS} for row in rows])
+        self.pa.parquet.write_table(table, os.path.join(self.directory, f"part-{self.parts:05d}.parquet"))
+        self.parts += 1
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+def add_job_routes(app, manager):
+    """Register the bulk scoring endpoints on a Flask app; all of them need admin access"""
+    from model_registry import admin_authorized
+
+    @app.route('/jobs', methods=['POST'])
+    def submit_job():
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        # Checked by Werkzeug while the upload is read, so oversized bodies get a 413
+        request.max_content_length = manager.max_upload_bytes
+        fmt = request.values.get('format') or (request.get_json(silent=True) or {}).get('format', 'csv')
+        try:
+            if 'archive' in request.files:
+                job_id = manager.submit_zip(request.files['archive'], fmt)
+            else:
+                directory = (request.get_json(silent=True) or {}).get('directory')
+                if not directory:
+                    return jsonify({'error': "Provide a zip file as 'archive' or a JSON 'directory'"}), 400
+                job_id = manager.submit_directory(directory, fmt)
+        except PermissionError as e:
+            return jsonify({'error': str(e)}), 403
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+
+    @app.route('/jobs', methods=['GET'])
+    def list_jobs():
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        return jsonify([manager.status(job['id']) for job in manager.store.list()])
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        status = manager.status(job_id)
+        if status is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify(status)
+
+    @app.route('/jobs/<job_id>/results', methods=['GET'])
+    def job_results(job_id):
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        job = manager.store.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        if job['format'] != 'csv':
+            return jsonify({'error': 'Parquet results are written as part files', 'path': job['output']}), 409
+        if not os.path.exists(job['output']):
+            return jsonify({'error': 'No results yet'}), 404
+        return send_file(os.path.abspath(job['output']), mimetype='text/csv',
+                         as_attachment=True, download_name=f'{job_id}.csv')
@@ -0,0 +1,87 @@
+# ecg_model.py
+#
+# The ECG model as served by predict_image.py: loading from the registry,
+# image preprocessing, classification and the response fields. Importing this
+# starts loading the model and nothing else, so other services (e.g.
+# predict_combined.py) can score ECG images without the ECG service's bulk
+# jobs, experiments or routes.
+
+from worker_config import configure_worker
+
+# Thread pools have to be sized before TensorFlow is imported
+worker_settings = configure_worker()
+
+import io
+import base64
+import numpy as np
+from tensorflow.keras.models import load_model
+from tensorflow.keras.preprocessing import image
+from structured_logging import configure_logging
+from model_registry import ServedModel, start_serving
+
+logger = configure_logging('ecg-predictor')
+
+# Constants
+IMG_HEIGHT = 224
+IMG_WIDTH = 224
+MODEL_NAME = 'ecg'
+MODEL_PATH = 'diabetes_cnn_model.keras'
+
+def load_artifacts(paths):
+    return {'model': load_model(paths['model'])}
+
+def warm_up(bundle):
+    """Run one prediction so the first real request doesn't pay for graph building"""
+    bundle['model'].predict(np.zeros((1, IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32), verbose=0)
+
+def load_ecg_image(image_data):
+    """Decode image bytes into a normalized (IMG_HEIGHT, IMG_WIDTH, 3) array"""
+    img = image.load_img(io.BytesIO(image_data), target_size=(IMG_HEIGHT, IMG_WIDTH))
+    return image.img_to_array(img) / 255.0
+
+def classify(bundle, img_array):
+    """Return (predicted_class, confidence, raw diabetic probability)"""
+    prediction = bundle['model'].predict(img_array, verbose=0)
+    predicted_class = int(np.argmax(prediction[0]))  # Convert numpy int to Python int
+    confidence = float(prediction[0][predicted_class])  # Convert numpy float to Python float
+    return predicted_class, confidence, float(prediction[0][0])
+
+def decode_image_payload(image_b64):
+    """Decode a base64 image (optionally a data URL) into a batch of one preprocessed image"""
+    # Remove the header if it exists (e.g., "data:image/jpeg;base64,")
+    if ',' in image_b64:
+        image_b64 = image_b64.split(',')[1]
+    image_data = base64.b64decode(image_b64)
+    return np.expand_dims(load_ecg_image(image_data), axis=0)
+
+def describe(predicted_class, confidence, raw_prediction, served, bundle):
+    """Build the response for one classified image"""
+    is_diabetic = bool(predicted_class == 0)  # Convert to Python bool
+
+    # Determine risk level
+    if is_diabetic:
+        if confidence > 0.85:
+            risk = 'high'
+        elif confidence > 0.7:
+            risk = 'moderate'
+        else:
+            risk = 'moderate'
+    else:
+        risk = 'low'
+
+    # Create response - ensuring all values are JSON serializable
+    return {
+        'prediction': 'Diabetic' if is_diabetic else 'Non-Diabetic',
+        'isDiabetic': is_diabetic,
+        'confidence': round(confidence * 100, 2),
+        'risk': risk,
+        'rawPrediction': raw_prediction,
+        'model': served.name,
+        'modelVersion': bundle.version
+    }
+
+# Load the active registry version at startup, falling back to MODEL_PATH
+logger.info("Loading ECG prediction model...")
+served_model = ServedModel(MODEL_NAME, load_artifacts, legacy_files={'model': MODEL_PATH},
+                           warmup=warm_up)
+start_serving(served_model)
@@ -0,0 +1,285 @@
+# evaluate.py
+#
+# Evaluate the saved clinical and ECG models on their test splits. Rows and
+# images are streamed through the models in batches and the metrics are
+# accumulated incrementally, so memory use does not grow with the dataset.
+# The metrics are written as JSON; plots are optional and rendered from the
+# report by confusion_matrix.py.
+#
+#   python evaluate.py --task all --output evaluation_report.json
+#   python evaluate.py --task clinical --split all --plot
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import joblib
+from openpyxl import load_workbook
+from sklearn.model_selection import train_test_split
+from clinical_features import feature_names, to_cnn_input, DATASET_PATH, TARGET_COLUMN
+
+# Class index 0 is GDM / diabetic in both models (see predict_clinical.py and
+# the alphabetical class folders used by predict_image.py)
+CLASS_LABELS = ["GDM", "Non-GDM"]
+IMAGE_EXTENSIONS = ('.bmp', '.jpg', '.jpeg', '.png')
+
+class StreamingBinaryMetrics:
+    """
+    Accumulates binary classification metrics batch by batch.
+
+    Scores are the predicted probability of the positive class (GDM). ROC/AUC
+    is computed from fixed-width score histograms, so state is O(bins) no
+    matter how many samples are seen.
+    """
+
+    def __init__(self, threshold=0.5, roc_bins=1000, calibration_bins=10):
+        self.threshold = threshold
+        self.roc_bins = roc_bins
+        self.calibration_bins = calibration_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # rows: true, cols: predicted
+        self.pos_hist = np.zeros(roc_bins, dtype=np.int64)
+        self.neg_hist = np.zeros(roc_bins, dtype=np.int64)
+        self.cal_count = np.zeros(calibration_bins, dtype=np.int64)
+        self.cal_score_sum = np.zeros(calibration_bins, dtype=np.float64)
+        self.cal_positive = np.zeros(calibration_bins, dtype=np.int64)
+
+    def update(self, is_positive, scores):
+        is_positive = np.asarray(is_positive, dtype=bool)
+        scores = np.clip(np.asarray(scores, dtype=np.float64), 0.0, 1.0)
+
+        # Index 0 is the positive class, matching CLASS_LABELS
+        true_idx = (~is_positive).astype(np.int64)
+        pred_idx = (scores < self.threshold).astype(np.int64)
+        self.confusion += np.bincount(true_idx * 2 + pred_idx, minlength=4).reshape(2, 2)
+
+        roc_idx = np.minimum((scores * self.roc_bins).astype(np.int64), self.roc_bins - 1)
+        self.pos_hist += np.bincount(roc_idx[is_positive], minlength=self.roc_bins)
+        self.neg_hist += np.bincount(roc_idx[~is_positive], minlength=self.roc_bins)
+
+        cal_idx = np.minimum((scores * self.calibration_bins).astype(np.int64), self.calibration_bins - 1)
+        self.cal_count += np.bincount(cal_idx, minlength=self.calibration_bins)
+        self.cal_score_sum += np.bincount(cal_idx, weights=scores, minlength=self.calibration_bins)
+        self.cal_positive += np.bincount(cal_idx[is_positive], minlength=self.calibration_bins)
+
+    def roc_curve(self):
+        """Return (fpr, tpr, thresholds) evaluated at the histogram bin edges, high to low"""
+        tp = np.concatenate([[0], np.cumsum(self.pos_hist[::-1])])
+        fp = np.concatenate([[0], np.cumsum(self.neg_hist[::-1])])
+        tpr = tp / max(tp[-1], 1)
+        fpr = fp / max(fp[-1], 1)
+        thresholds = np.linspace(1.0, 0.0, self.roc_bins + 1)
+        return fpr, tpr, thresholds
+
+    def result(self):
+        tp, fn = (int(v) for v in self.confusion[0])
+        fp, tn = (int(v) for v in self.confusion[1])
+        total = tp + fn + fp + tn
+
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+        fpr, tpr, thresholds = self.roc_curve()
+        has_both = self.pos_hist.sum() and self.neg_hist.sum()
+        auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)) if has_both else None
+
+        # Keep about 100 ROC points in the report
+        step = max(1, self.roc_bins // 100)
+        keep = np.unique(np.concatenate([np.arange(0, len(fpr), step), [len(fpr) - 1]]))
+
+        calibration = []
+        ece = 0.0
+        for i in range(self.calibration_bins):
+            count = int(self.cal_count[i])
+            mean_score = self.cal_score_sum[i] / count if count else None
+            positive_rate = self.cal_positive[i] / count if count else None
+            if count:
+                ece += count / max(total, 1) * abs(mean_score - positive_rate)
+            calibration.append({
+                'bin': [i / self.calibration_bins, (i + 1) / self.calibration_bins],
+                'count': count,
+                'mean_score': None if mean_score is None else round(float(mean_score), 4),
+                'positive_rate': None if positive_rate is None else round(float(positive_rate), 4),
+            })
+
+        return {
+            'samples': total,
+            'threshold': self.threshold,
+            'labels': CLASS_LABELS,
+            'confusion_matrix': self.confusion.tolist(),
+            'accuracy': round((tp + tn) / total, 4) if total else 0.0,
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(f1, 4),
+            'roc_auc': None if auc is None else round(auc, 4),
+            'roc_curve': {
+                'fpr': [round(float(v), 4) for v in fpr[keep]],
+                'tpr': [round(float(v), 4) for v in tpr[keep]],
+                'thresholds': [round(float(v), 4) for v in thresholds[keep]],
+            },
+            'calibration': calibration,
+            'expected_calibration_error': round(float(ece), 4),
+        }
+
+def iter_clinical_rows(file_path=DATASET_PATH):
+    """Yield (feature_values, label) from the dataset, reading the sheet row by row"""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows))
+        columns = [header.index(name) for name in feature_names]
+        target = header.index(TARGET_COLUMN)
+        for row in rows:
+            if row[target] is None:
+                continue
+            values = [np.nan if row[c] is None else float(row[c]) for c in columns]
+            yield values, int(row[target])
+    finally:
+        workbook.close()
+
+def clinical_column_means(file_path=DATASET_PATH):
+    """First pass: per-column means (ignoring missing values) and row count"""
+    sums = np.zeros(len(feature_names))
+    counts = np.zeros(len(feature_names))
+    rows = 0
+    for values, _ in iter_clinical_rows(file_path):
+        values = np.array(values)
+        present = ~np.isnan(values)
+        sums[present] += values[present]
+        counts[present] += 1
+        rows += 1
+    return sums / np.maximum(counts, 1), rows
+
+def iter_clinical_batches(split, batch_size, file_path=DATASET_PATH):
+    """
+    Yield (features, labels) batches with missing values filled by column means,
+    as in train_clinical_model.py. The 'test' split reproduces its 80/20 split.
+    """
+    means, num_rows = clinical_column_means(file_path)
+    if split == 'test':
+        _, test_idx = train_test_split(np.arange(num_rows), test_size=0.2, random_state=42)
+        selected = np.zeros(num_rows, dtype=bool)
+        selected[test_idx] = True
+    else:
+        selected = np.ones(num_rows, dtype=bool)
+
+    features, labels = [], []
+    for i, (values, label) in enumerate(iter_clinical_rows(file_path)):
+        if not selected[i]:
+            continue
+        features.append(values)
+        labels.append(label)
+        if len(features) == batch_size:
+            yield _fill_missing(features, means), np.array(labels)
+            features, labels = [], []
+    if features:
+        yield _fill_missing(features, means), np.array(labels)
+
+def _fill_missing(features, means):
+    features = np.array(features)
+    missing = np.isnan(features)
+    features[missing] = np.take(means, np.nonzero(missing)[1])
+    return features
+
+def evaluate_clinical(model_path, scaler_path, split, batch_size, metrics):
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path)
+    scaler = joblib.load(scaler_path)
+    for features, labels in iter_clinical_batches(split, batch_size):
+        prediction = model.predict_on_batch(to_cnn_input(scaler.transform(features)))
+        # The clinical model outputs P(class 1 = Non-GDM)
+        metrics.update(labels == 0, 1.0 - np.asarray(prediction)[:, 0])
+
+def iter_image_batches(directory, batch_size, target_size):
+    """Yield (images, labels) batches from class subfolders, one file at a time"""
+    from tensorflow.keras.preprocessing import image
+
+    classes = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    batch = np.zeros((batch_size,) + target_size + (3,), dtype=np.float32)
+    labels = np.zeros(batch_size, dtype=np.int64)
+    n = 0
+    for label, class_name in enumerate(classes):
+        class_dir = os.path.join(directory, class_name)
+        for name in sorted(os.listdir(class_dir)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = image.load_img(os.path.join(class_dir, name), target_size=target_size)
+            batch[n] = image.img_to_array(img) / 255.0
+            labels[n] = label
+            n += 1
+            if n == batch_size:
+                yield batch, labels
+                n = 0
+    if n:
+        yield batch[:n], labels[:n]
+
+def evaluate_ecg(model_path, directory, batch_size, metrics, target_size=(224, 224)):
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path)
+    for images, labels in iter_image_batches(directory, batch_size, target_size):
+        prediction = np.asarray(model.predict_on_batch(images))
+        # Softmax column 0 is the 'diabetic' folder
+        metrics.update(labels == 0, prediction[:, 0])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate the saved clinical and ECG models')
+    parser.add_argument('--task', choices=['clinical', 'ecg', 'all'], default='all')
+    parser.add_argument('--split', choices=['test', 'all'], default='test',
+                        help="Clinical rows to evaluate: the training script's test split or every row")
+    parser.add_argument('--clinical-model', default='clinical_cnn_model.keras')
+    parser.add_argument('--clinical-scaler', default='clinical_scaler.pkl')
+    parser.add_argument('--clinical-batch-size', type=int, default=4096)
+    parser.add_argument('--ecg-model', default='diabetes_cnn_model.keras')
+    parser.add_argument('--ecg-dir', default=os.path.join('dataset', 'test'))
+    parser.add_argument('--ecg-batch-size', type=int, default=64)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--output', default='evaluation_report.json')
+    parser.add_argument('--plot', action='store_true',
+                        help='Render confusion matrices from the report after evaluating')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    tasks = ['clinical', 'ecg'] if args.task == 'all' else [args.task]
+    report = {'generated': time.strftime('%Y-%m-%dT%H:%M:%S'), 'tasks': {}}
+
+    for task in tasks:
+        metrics = StreamingBinaryMetrics(threshold=args.threshold)
+        start = time.perf_counter()
+        if task == 'clinical':
+            evaluate_clinical(args.clinical_model, args.clinical_scaler, args.split,
+                              args.clinical_batch_size, metrics)
+            source = {'model': args.clinical_model, 'scaler': args.clinical_scaler, 'split': args.split}
+        else:
+            evaluate_ecg(args.ecg_model, args.ecg_dir, args.ecg_batch_size, metrics)
+            source = {'model': args.ecg_model, 'directory': args.ecg_dir}
+        elapsed = time.perf_counter() - start
+
+        result = metrics.result()
+        result['source'] = source
+        result['seconds'] = round(elapsed, 3)
+        result['samples_per_second'] = round(result['samples'] / elapsed, 1) if elapsed else None
+        report['tasks'][task] = result
+
+        print(f"=== {task} ===")
+        print(f"Samples: {result['samples']} ({result['samples_per_second']}/s)")
+        print(f"Precision: {result['precision']:.2f}")
+        print(f"Recall: {result['recall']:.2f}")
+        print(f"F1-Score: {result['f1']:.2f}")
+        print(f"ROC AUC: {result['roc_auc']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.plot:
+        from confusion_matrix import plot_report
+        plot_report(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
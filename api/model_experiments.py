@@ -0,0 +1,261 @@
+# model_experiments.py
+#
+# Shadow and A/B execution of alternative models next to the primary one.
+#
+# Shadow models score the same input on a background executor after the primary
+# result is ready, so they never add latency to the response. A/B routing sends
+# a weighted share of requests to another model instead. Every scored request
+# is recorded in a local SQLite store with its latency, CPU cost and, for
+# shadows, whether it agreed with the primary model.
+#
+#   python model_experiments.py summary --db ecg_experiments.sqlite
+
+import sys
+import json
+import time
+import queue
+import random
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from flask import jsonify
+
+logger = logging.getLogger('model-experiments')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    model TEXT NOT NULL,
+    version TEXT,
+    role TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    cpu_ms REAL NOT NULL,
+    label INTEGER,
+    confidence REAL,
+    agrees INTEGER
+);
+CREATE INDEX IF NOT EXISTS predictions_model ON predictions (model, role);
+"""
+
+def parse_split(spec):
+    """Parse "model=weight,model=weight" into a dict of floats"""
+    split = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, weight = item.split('=', 1)
+            split[name.strip()] = float(weight)
+    return split
+
+def parse_names(spec):
+    return [name.strip() for name in (spec or '').split(',') if name.strip()]
+
+class ExperimentStore:
+    """SQLite store for per-request model measurements, written by one background thread"""
+
+    def __init__(self, path, flush_every=50):
+        self.path = path
+        self.flush_every = flush_every
+        self._queue = queue.SimpleQueue()
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def record(self, request_id, model, version, role, latency_ms, cpu_ms,
+               label=None, confidence=None, agrees=None):
+        self._queue.put((request_id, time.time(), model, version, role, latency_ms, cpu_ms,
+                         label, confidence, None if agrees is None else int(agrees)))
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path)
+        while True:
+            rows = [self._queue.get()]
+            while len(rows) < self.flush_every:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn.executemany(
+                    "INSERT INTO predictions (request_id, created, model, version, role, latency_ms, "
+                    "cpu_ms, label, confidence, agrees) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Could not record {len(rows)} experiment rows: {str(e)}")
+
+    def summary(self, since=None, latency_sample=10000):
+        return summarize(self.path, since, latency_sample)
+
+def summarize(path, since=None, latency_sample=10000):
+    """Per model/role: request count, latency percentiles, mean CPU and agreement with the primary"""
+    conn = sqlite3.connect(path)
+    try:
+        where, params = ("WHERE created >= ?", [since]) if since else ("", [])
+        groups = conn.execute(
+            f"SELECT model, role, COUNT(*), AVG(cpu_ms), AVG(agrees), COUNT(agrees) "
+            f"FROM predictions {where} GROUP BY model, role ORDER BY model, role", params).fetchall()
+
+        summary = []
+        for model, role, count, cpu_ms, agreement, compared in groups:
+            latencies = np.array([row[0] for row in conn.execute(
+                f"SELECT latency_ms FROM predictions {where} {'AND' if where else 'WHERE'} "
+                f"model = ? AND role = ? ORDER BY id DESC LIMIT ?",
+                params + [model, role, latency_sample])])
+            summary.append({
+                'model': model,
+                'role': role,
+                'requests': count,
+                'latency_ms': {
+                    'mean': round(float(latencies.mean()), 2),
+                    'p50': round(float(np.percentile(latencies, 50)), 2),
+                    'p95': round(float(np.percentile(latencies, 95)), 2),
+                    'p99': round(float(np.percentile(latencies, 99)), 2),
+                },
+                'cpu_ms_mean': round(cpu_ms, 2),
+                'agreement_rate': round(agreement, 4) if compared else None,
+            })
+        return summary
+    finally:
+        conn.close()
+
+class ModelExperiment:
+    """
+    Runs a primary ServedModel plus optional shadow and A/B variants.
+
+    predict_fn(bundle, inputs) returns a tuple starting with (label, confidence)
+    and is what gets timed for every model. Variants are ServedModels keyed by
+    registry name.
+    """
+
+    def __init__(self, primary, variants, predict_fn, shadows=(), split=None, store=None,
+                 shadow_workers=1, max_pending=32):
+        self.primary = primary
+        self.variants = variants
+        self.predict_fn = predict_fn
+        self.shadows = [name for name in shadows if name in variants]
+        self.split = {name: weight for name, weight in (split or {}).items()
+                      if weight > 0 and (name == primary.name or name in variants)}
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=shadow_workers,
+                                            thread_name_prefix='shadow') if self.shadows else None
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self.fallbacks = {}  # variant name -> requests routed to the primary because it wasn't loaded
+        self._unavailable = set()
+        self._fallback_lock = threading.Lock()  # choose() runs on every request thread
+
+    @property
+    def enabled(self):
+        return bool(self.shadows or self.split)
+
+    def served_models(self):
+        return [self.primary] + list(self.variants.values())
+
+    def choose(self, key=None):
+        """
+        Pick the model that serves this request. With a key (e.g. a client id)
+        the choice is sticky; otherwise it is random by weight. A variant that
+        isn't loaded hands its requests to the primary instead of failing them.
+        """
+        if not self.split:
+            return self.primary
+        names = sorted(self.split)
+        weights = np.array([self.split[name] for name in names])
+        if key is not None:
+            point = int(hashlib.sha1(str(key).encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        else:
+            point = random.random()
+        cumulative = np.cumsum(weights) / weights.sum()
+        name = names[min(int(np.searchsorted(cumulative, point, side='right')), len(names) - 1)]
+        if name == self.primary.name:
+            return self.primary
+        served = self.variants[name]
+        loaded = served.current() is not None
+        with self._fallback_lock:
+            if not loaded:
+                self.fallbacks[name] = self.fallbacks.get(name, 0) + 1
+                if name not in self._unavailable:
+                    self._unavailable.add(name)
+                    logger.warning(f"A/B variant {name} is not loaded, routing its share to {self.primary.name}")
+            elif name in self._unavailable:
+                self._unavailable.discard(name)
+                logger.info(f"A/B variant {name} is loaded, resuming its share")
+        return served if loaded else self.primary
+
+    def fallback_counts(self):
+        """Copy of the per-variant fallback counts"""
+        with self._fallback_lock:
+            return dict(self.fallbacks)
+
+    def run(self, served, inputs):
+        """Score inputs with one model; returns (bundle, predict_fn output, latency_ms, cpu_ms)"""
+        bundle = served.current()
+        if bundle is None:
+            raise RuntimeError(f"Model '{served.name}' is not loaded")
+        # process_time covers TensorFlow's worker threads too, so it is only
+        # exact when requests don't overlap; treat it as an estimate
+        cpu_start, start = time.process_time(), time.perf_counter()
+        output = self.predict_fn(bundle, inputs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        cpu_ms = (time.process_time() - cpu_start) * 1000
+        return bundle, output, latency_ms, cpu_ms
+
+    def record(self, request_id, served, bundle, role, latency_ms, cpu_ms, label, confidence, agrees=None):
+        if self.store is not None:
+            self.store.record(request_id, served.name, bundle.version, role,
+                              latency_ms, cpu_ms, label, confidence, agrees)
+
+    def submit_shadows(self, request_id, inputs, primary_label):
+        """Queue the shadow models on the background executor; drops work when the backlog is full"""
+        for name in self.shadows:
+            if not self._pending.acquire(blocking=False):
+                logger.warning(f"Shadow backlog full, skipping {name}")
+                continue
+            future = self._executor.submit(self._run_shadow, request_id, name, inputs, primary_label)
+            future.add_done_callback(lambda _: self._pending.release())
+
+    def _run_shadow(self, request_id, name, inputs, primary_label):
+        served = self.variants[name]
+        try:
+            bundle, (label, confidence, *_), latency_ms, cpu_ms = self.run(served, inputs)
+        except Exception as e:
+            logger.warning(f"Shadow model {name} failed: {str(e)}")
+            return
+        self.record(request_id, served, bundle, 'shadow', latency_ms, cpu_ms,
+                    label, confidence, agrees=label == primary_label)
+
+def add_experiment_routes(app, experiment, path='/experiments'):
+    """Register GET <path> returning the experiment store summary (admin token applies)"""
+    from model_registry import admin_authorized
+
+    @app.route(path, methods=['GET'])
+    def experiment_summary():
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        return jsonify({
+            'primary': experiment.primary.name,
+            'shadows': experiment.shadows,
+            'split': experiment.split,
+            'fallbacks': experiment.fallback_counts(),
+            'models': experiment.store.summary() if experiment.store is not None else [],
+        })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize recorded shadow and A/B model runs')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('summary')
+    p.add_argument('--db', default='ecg_experiments.sqlite')
+    p.add_argument('--hours', type=float, help='Only include the last N hours')
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    print(json.dumps(summarize(args.db, since), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,341 @@
+# model_registry.py
+#
+# Versioned model artifacts with checksums, and hot-swapping of the model a
+# service is serving.
+#
+# Registry layout (MODEL_REGISTRY_DIR, default 'model_registry'):
+#
+#   model_registry/<name>/ACTIVE              version the services should serve
+#   model_registry/<name>/<version>/manifest.json
+#   model_registry/<name>/<version>/<artifact files>
+#
+# A ServedModel loads a version in a background thread, verifies checksums,
+# warms it up and then swaps it in with a single reference assignment. Requests
+# take a reference to the current bundle when they start, so in-flight
+# requests finish on the old version.
+#
+#   python model_registry.py publish clinical model=clinical_cnn_model.keras scaler=clinical_scaler.pkl
+#   python model_registry.py activate clinical v2
+#   python model_registry.py list clinical
+
+import os
+import sys
+import json
+import time
+import shutil
+import hmac
+import hashlib
+import logging
+import argparse
+import threading
+from flask import request, jsonify
+
+REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'model_registry')
+LEGACY_VERSION = 'legacy'
+
+logger = logging.getLogger('model-registry')
+
+def sha256sum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _model_dir(name, registry_dir=None):
+    return os.path.join(registry_dir or REGISTRY_DIR, name)
+
+def list_versions(name, registry_dir=None):
+    """Return published versions of a model, oldest first"""
+    model_dir = _model_dir(name, registry_dir)
+    if not os.path.isdir(model_dir):
+        return []
+    versions = [v for v in os.listdir(model_dir)
+                if os.path.isfile(os.path.join(model_dir, v, 'manifest.json'))]
+    return sorted(versions, key=lambda v: (read_manifest(name, v, registry_dir)['created'], _version_number(v), v))
+
+def _version_number(version):
+    return int(version[1:]) if version.startswith('v') and version[1:].isdigit() else -1
+
+def read_manifest(name, version, registry_dir=None):
+    with open(os.path.join(_model_dir(name, registry_dir), version, 'manifest.json')) as f:
+        return json.load(f)
+
+def active_version(name, registry_dir=None):
+    """
+    Version named in the ACTIVE file, else None. Publishing alone never changes
+    what is served; only set_active (or publish(activate=True)) does.
+    """
+    pointer = os.path.join(_model_dir(name, registry_dir), 'ACTIVE')
+    if os.path.isfile(pointer):
+        with open(pointer) as f:
+            version = f.read().strip()
+        if version:
+            return version
+    return None
+
+def set_active(name, version, registry_dir=None):
+    """Point ACTIVE at version; the file is replaced atomically so watchers never see a partial write"""
+    if version not in list_versions(name, registry_dir):
+        raise ValueError(f"Unknown version '{version}' for model '{name}'")
+    pointer = os.path.join(_model_dir(name, registry_dir), 'ACTIVE')
+    tmp = pointer + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, pointer)
+
+def publish(name, files, version=None, metadata=None, registry_dir=None, activate=False):
+    """
+    Copy artifact files into a new registry version and record their checksums.
+    files maps a role (e.g. 'model', 'scaler') to a path.
+    """
+    existing = list_versions(name, registry_dir)
+    if version is None:
+        version = f"v{max([_version_number(v) for v in existing], default=0) + 1}"
+    elif version in existing:
+        raise ValueError(f"Version '{version}' of model '{name}' already exists")
+
+    version_dir = os.path.join(_model_dir(name, registry_dir), version)
+    staging = version_dir + '.staging'
+    os.makedirs(staging)
+
+    artifacts = {}
+    for role, path in files.items():
+        filename = os.path.basename(path)
+        staged = os.path.join(staging, filename)
+        shutil.copy2(path, staged)
+        artifacts[role] = {'file': filename, 'sha256': sha256sum(staged)}
+
+    manifest = {
+        'name': name,
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'artifacts': artifacts,
+        'metadata': metadata or {},
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, version_dir)
+
+    if activate:
+        set_active(name, version, registry_dir)
+    return version
+
+def resolve_artifacts(name, version, registry_dir=None):
+    """Return {role: path} for a version after verifying every checksum"""
+    manifest = read_manifest(name, version, registry_dir)
+    version_dir = os.path.join(_model_dir(name, registry_dir), version)
+    paths = {}
+    for role, artifact in manifest['artifacts'].items():
+        path = os.path.join(version_dir, artifact['file'])
+        if sha256sum(path) != artifact['sha256']:
+            raise ValueError(f"Checksum mismatch for {name} {version} artifact '{role}'")
+        paths[role] = path
+    return paths
+
+class LoadedModel:
+    """An immutable bundle of loaded artifacts for one model version"""
+
+    def __init__(self, name, version, artifacts):
+        self.name = name
+        self.version = version
+        self.artifacts = artifacts
+        self.loaded_at = time.time()
+
+    def __getitem__(self, role):
+        return self.artifacts[role]
+
+class ServedModel:
+    """
+    The version of a model a service is currently serving.
+
+    loader(paths) turns {role: path} into {role: object}; warmup(bundle) is run
+    on a freshly loaded bundle before it is swapped in. legacy_files are used
+    when the registry has no active version of this model; pass None for models
+    that only exist in the registry.
+    """
+
+    def __init__(self, name, loader, legacy_files, warmup=None, registry_dir=None):
+        self.name = name
+        self.loader = loader
+        self.legacy_files = legacy_files
+        self.warmup = warmup
+        self.registry_dir = registry_dir
+        self.loading = None
+        self.last_error = None
+        self._failed_version = None
+        self._current = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def current(self):
+        """The bundle to use for one request; keep the reference for the whole request"""
+        return self._current
+
+    @property
+    def version(self):
+        bundle = self._current
+        return bundle.version if bundle is not None else None
+
+    def _paths_for(self, version):
+        if version is None:
+            version = active_version(self.name, self.registry_dir)
+        if version is None:
+            if self.legacy_files is None:
+                raise FileNotFoundError(f"No active version of model '{self.name}'")
+            return LEGACY_VERSION, dict(self.legacy_files)
+        return version, resolve_artifacts(self.name, version, self.registry_dir)
+
+    def reload(self, version=None):
+        """Load, warm up and swap in a version (default: the active one). Blocks until done."""
+        with self._reload_lock:
+            try:
+                version, paths = self._paths_for(version)
+                self.loading = version
+                logger.info(f"Loading {self.name} version {version}")
+                bundle = LoadedModel(self.name, version, self.loader(paths))
+                if self.warmup is not None:
+                    self.warmup(bundle)
+                self._current = bundle
+                self.last_error = None
+                self._failed_version = None
+                logger.info(f"Now serving {self.name} version {version}")
+                return version
+            except Exception as e:
+                self.last_error = str(e)
+                self._failed_version = version
+                logger.error(f"Failed to load {self.name} version {version}: {str(e)}", exc_info=True)
+                raise
+            finally:
+                self.loading = None
+
+    def reload_async(self, version=None):
+        """Reload in a background thread; the current version keeps serving meanwhile"""
+        thread = threading.Thread(target=self._reload_quietly, args=(version,), daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_quietly(self, version):
+        try:
+            self.reload(version)
+        except Exception:
+            pass  # already logged, previous version stays active
+
+    def watch(self, interval):
+        """Poll the registry's ACTIVE version and reload when it changes"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    wanted = active_version(self.name, self.registry_dir)
+                except Exception as e:
+                    logger.warning(f"Could not read active version of {self.name}: {str(e)}")
+                    continue
+                # Don't retry a version that already failed until ACTIVE changes
+                if wanted not in (None, self.version, self.loading, self._failed_version):
+                    self._reload_quietly(wanted)
+
+        self._watcher = threading.Thread(target=poll, daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'loading': self.loading,
+            'last_error': self.last_error,
+            'available_versions': list_versions(self.name, self.registry_dir),
+        }
+
+def start_serving(served, watch_interval=None):
+    """Load the active version at startup and start the file watcher if configured"""
+    try:
+        served.reload()
+    except Exception:
+        pass  # service reports 503 until a version loads
+    if watch_interval is None:
+        watch_interval = float(os.getenv('MODEL_WATCH_INTERVAL', '0'))
+    served.watch(watch_interval)
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+def admin_authorized():
+    """
+    True if the current request may use admin endpoints: it must send
+    ADMIN_TOKEN, or come from this machine when no token is configured
+    """
+    token = os.getenv('ADMIN_TOKEN')
+    if not token:
+        return request.remote_addr in LOOPBACK_ADDRESSES
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+def add_admin_routes(app, served_models):
+    """
+    Register POST /admin/reload and GET /admin/models on a Flask app.
+    Reloading a specific version also makes it the registry's active version,
+    so other workers watching the registry follow. Requests must send
+    ADMIN_TOKEN in the X-Admin-Token header; without a token only loopback
+    clients are allowed.
+    """
+    by_name = {served.name: served for served in served_models}
+
+    @app.route('/admin/models', methods=['GET'])
+    def admin_models():
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        return jsonify({name: served.status() for name, served in by_name.items()})
+
+    @app.route('/admin/reload', methods=['POST'])
+    def admin_reload():
+        if not admin_authorized():
+            return jsonify({'error': 'Unauthorized'}), 401
+        data = request.get_json(silent=True) or {}
+        name = data.get('model', next(iter(by_name)))
+        if name not in by_name:
+            return jsonify({'error': f'Unknown model: {name}'}), 404
+        version = data.get('version')
+        if version is not None:
+            if version not in list_versions(name, by_name[name].registry_dir):
+                return jsonify({'error': f'Unknown version: {version}'}), 404
+            set_active(name, version, by_name[name].registry_dir)
+        by_name[name].reload_async(version)
+        return jsonify({'model': name, 'requested_version': version or 'active',
+                        'serving_version': by_name[name].version}), 202
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('publish', help='Register artifact files as a new version')
+    p.add_argument('name')
+    p.add_argument('files', nargs='+', help='role=path, e.g. model=clinical_cnn_model.keras')
+    p.add_argument('--version')
+    p.add_argument('--activate', action='store_true')
+
+    p = sub.add_parser('activate', help='Set the version services should serve')
+    p.add_argument('name')
+    p.add_argument('version')
+
+    p = sub.add_parser('list', help='List versions of a model')
+    p.add_argument('name')
+
+    args = parser.parse_args(argv)
+    if args.command == 'publish':
+        files = dict(item.split('=', 1) for item in args.files)
+        version = publish(args.name, files, version=args.version, activate=args.activate)
+        print(f"Published {args.name} {version}")
+    elif args.command == 'activate':
+        set_active(args.name, args.version)
+        print(f"{args.name} active version: {args.version}")
+    else:
+        active = active_version(args.name)
+        for version in list_versions(args.name):
+            marker = '*' if version == active else ' '
+            print(f"{marker} {version}  {read_manifest(args.name, version)['created']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
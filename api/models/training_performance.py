@@ -0,0 +1,170 @@
+# models/training_performance.py
+#
+# CPU training options for the ECG model builders in model_definitions.py:
+# XLA compilation, bfloat16 mixed precision with float32 checkpoints,
+# gradient accumulation, a profiler trace window and a per-epoch throughput
+# callback.
+
+import time
+import tensorflow as tf
+
+BFLOAT16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+def cpu_supports_bfloat16():
+    """True if the CPU has native bfloat16 instructions (AVX512-BF16 or AMX); Linux only"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = set(f.read().split())
+    except OSError:
+        return False
+    return any(flag in flags for flag in BFLOAT16_CPU_FLAGS)
+
+def set_precision(precision):
+    """
+    Set the global Keras dtype policy before building a model. 'auto' uses
+    bfloat16 only when the CPU supports it natively. Returns the policy name.
+    """
+    use_bfloat16 = precision == 'bfloat16' or (precision == 'auto' and cpu_supports_bfloat16())
+    if precision == 'bfloat16' and not cpu_supports_bfloat16():
+        print("Warning: this CPU has no native bfloat16 support, mixed precision will be emulated and slow")
+    policy = 'mixed_bfloat16' if use_bfloat16 else 'float32'
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return policy
+
+def build(builder, input_shape, num_classes, precision='float32'):
+    """
+    Build a model under the given precision. Under mixed precision the final
+    softmax Dense layer is rebuilt in float32, so the output layer computes
+    (not just returns) float32 and the loss stays stable.
+    """
+    policy = set_precision(precision)
+    model = builder(input_shape=input_shape, num_classes=num_classes)
+    if policy != 'float32':
+        output = model.layers[-1]
+        model = tf.keras.Sequential(
+            [tf.keras.Input(shape=input_shape)] + model.layers[:-1] +
+            [tf.keras.layers.Dense(output.units, activation=output.activation, dtype='float32')]
+        )
+    return model, policy
+
+def compile_model(model, jit_compile=False, accumulation_steps=1, learning_rate=0.001):
+    """Compile with Adam as train_model.py does, optionally XLA-compiled and accumulating gradients"""
+    optimizer_args = {'learning_rate': learning_rate}
+    if accumulation_steps > 1:
+        # Keras 3 optimizers apply the averaged gradients every accumulation_steps batches
+        optimizer_args['gradient_accumulation_steps'] = accumulation_steps
+    try:
+        optimizer = tf.keras.optimizers.Adam(**optimizer_args)
+    except TypeError:
+        raise SystemExit("Gradient accumulation needs Keras 3 (TensorFlow 2.16 or newer)")
+    model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'],
+                  jit_compile=jit_compile)
+    return model
+
+def to_float32(model, builder, input_shape, num_classes):
+    """
+    Copy trained weights into a float32 build of the same architecture, so the
+    saved model serves at full precision whatever policy it was trained with.
+    """
+    if all(layer.dtype_policy.name == 'float32' for layer in model.layers):
+        return model
+    policy = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy('float32')
+    try:
+        serving = builder(input_shape=input_shape, num_classes=num_classes)
+    finally:
+        tf.keras.mixed_precision.set_global_policy(policy)
+    # build() keeps the builder's layer order, so the weights line up one to one
+    serving.set_weights(model.get_weights())
+    return serving
+
+class Float32Checkpoint(tf.keras.callbacks.Callback):
+    """
+    ModelCheckpoint(save_best_only=True) for mixed precision training: saves
+    the float32 copy from to_float32() whenever the monitored loss improves.
+    """
+
+    def __init__(self, filepath, builder, input_shape, num_classes, monitor='val_loss'):
+        super().__init__()
+        self.filepath = filepath
+        self.builder = builder
+        self.input_shape = input_shape
+        self.num_classes = num_classes
+        self.monitor = monitor
+        self.best = float('inf')
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None or current >= self.best:
+            return
+        self.best = current
+        to_float32(self.model, self.builder, self.input_shape, self.num_classes).save(self.filepath)
+
+class ProfilerWindow(tf.keras.callbacks.Callback):
+    """
+    Records a profiler trace of training batches start..end (1-based, counted
+    across epochs) into log_dir, viewable in TensorBoard's Profile tab.
+    """
+
+    def __init__(self, log_dir, start, end):
+        super().__init__()
+        self.log_dir = log_dir
+        self.start = start
+        self.end = end
+        self._batch = 0
+        self._active = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._batch += 1
+        if self._batch == self.start:
+            tf.profiler.experimental.start(self.log_dir)
+            self._active = True
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self._active and self._batch >= self.end:
+            self._stop()
+
+    def on_train_end(self, logs=None):
+        if self._active:
+            self._stop()
+
+    def _stop(self):
+        tf.profiler.experimental.stop()
+        self._active = False
+
+def profiler_callback(log_dir, batches):
+    """ProfilerWindow for batches given as 'start,end'"""
+    start, end = (int(b) for b in batches.split(','))
+    return ProfilerWindow(log_dir, start, end)
+
+class EpochThroughput(tf.keras.callbacks.Callback):
+    """Records wall time and images per second for every training epoch"""
+
+    def __init__(self, images_per_epoch):
+        super().__init__()
+        self.images_per_epoch = images_per_epoch
+        self.epochs = []
+        self._start = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        self.epochs.append({
+            'epoch': epoch + 1,
+            'seconds': round(seconds, 3),
+            'images_per_second': round(self.images_per_epoch / seconds, 2),
+            'loss': round(float((logs or {}).get('loss', float('nan'))), 4),
+        })
+        print(f" epoch {epoch + 1}: {seconds:.2f}s, {self.images_per_epoch / seconds:.1f} images/s")
+
+    def summary(self):
+        """First epoch (includes tracing and XLA compilation) and the mean of the rest"""
+        steady = self.epochs[1:] or self.epochs
+        return {
+            'first_epoch_seconds': self.epochs[0]['seconds'] if self.epochs else None,
+            'steady_images_per_second': round(sum(e['images_per_second'] for e in steady) / len(steady), 2)
+                                        if steady else None,
+            'epochs': self.epochs,
+        }
@@ -1,139 +1,195 @@
 
+import os
+from worker_config import configure_worker
+
+# Thread pools have to be sized before TensorFlow is imported
+worker_settings = configure_worker()
+
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import load_model
 import joblib
+import time
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from clinical_features import feature_names, form_to_feature_mapping, to_cnn_input
+from structured_logging import configure_logging
+from model_registry import ServedModel, start_serving, add_admin_routes
+from tabular_model import TabularModel
+
+# Configure logging
+logger = configure_logging('clinical-predictor')
+ROUTE = '/predict'
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Load the trained model
-model = load_model('clinical_cnn_model.keras')
-print("Loaded model 'clinical_cnn_model.keras'")
-
-# Load the saved scaler
-scaler = joblib.load('clinical_scaler.pkl')
-print("Loaded scaler 'clinical_scaler.pkl'")
-
-# Input feature names and their mapping to form fields
-feature_names = [
-    'Age', 'No of Pregnancy', 'Gestation in previous Pregnancy', 'BMI', 'HDL', 'Family History',
-    'unexplained prenetal loss', 'Large Child or Birth Default', 'PCOS', 'Sys BP', 'Dia BP',
-    'OGTT', 'Hemoglobin', 'Sedentary Lifestyle', 'Prediabetes'
-]
-
-form_to_feature_mapping = {
-    'age': 'Age',
-    'pregnancyCount': 'No of Pregnancy',
-    'previousGestationPeriod': 'Gestation in previous Pregnancy',
-    'bmi': 'BMI',
-    'hdl': 'HDL',
-    'familyHistory': 'Family History',  # yes=1, no=0
-    'prenatalLoss': 'unexplained prenetal loss',  # yes=1, no=0
-    'birthDefects': 'Large Child or Birth Default',  # yes=1, no=0
-    'pcos': 'PCOS',  # yes=1, no=0
-    'systolicBP': 'Sys BP',
-    'diastolicBP': 'Dia BP',
-    'glucoseLevels': 'OGTT',
-    'hemoglobin': 'Hemoglobin',
-    'physicalActivity': 'Sedentary Lifestyle',  # low=1, medium/high=0
-    'prediabetes': 'Prediabetes'  # yes=1, no=0
-}
+# Model family to serve: 'cnn' (TensorFlow) or 'tabular' (NumPy-only, see train_clinical_tabular.py)
+MODEL_KIND = os.getenv('CLINICAL_MODEL_KIND', 'cnn')
+MODEL_NAME = 'clinical' if MODEL_KIND == 'cnn' else 'clinical-tabular'
+MODEL_PATH = 'clinical_cnn_model.keras'
+SCALER_PATH = 'clinical_scaler.pkl'
+TABULAR_MODEL_PATH = 'clinical_tabular_model.npz'
+
+def load_artifacts(paths):
+    """Load the trained model and the saved scaler"""
+    # Imported here so the tabular engine runs without TensorFlow installed
+    from tensorflow.keras.models import load_model
+    return {
+        'model': load_model(paths['model']),
+        'scaler': joblib.load(paths['scaler'])
+    }
+
+def load_tabular_artifacts(paths):
+    return {'model': TabularModel.load(paths['model'])}
+
+def score(bundle, patient_data):
+    """Return the model's probability of Non-GDM for one row of raw features"""
+    if MODEL_KIND == 'tabular':
+        return float(bundle['model'].predict_proba(patient_data)[0])
+
+    # Preprocess patient data and prepare for CNN input
+    patient_scaled = bundle['scaler'].transform(patient_data)
+    patient_cnn_input = to_cnn_input(patient_scaled)
+
+    prediction = bundle['model'].predict(patient_cnn_input, verbose=0)
+    return float(prediction[0][0])
+
+def warm_up(bundle):
+    """Run one prediction so the first real request doesn't pay for graph building"""
+    score(bundle, np.zeros((1, len(feature_names))))
+
+def encode_form(data):
+    """
+    Transform the frontend form into one row of raw features, shape (1, 15).
+    Raises ValueError when a required field is missing or not a number.
+    """
+    patient_data = []
+    
+    for feature in feature_names:
+        feature_value = None
+        
+        # Find the corresponding form field
+        for form_field, mapped_feature in form_to_feature_mapping.items():
+            if mapped_feature == feature:
+                # Get value from request data
+                if form_field in data:
+                    raw_value = data[form_field]
+                    
+                    # Convert string values to numeric
+                    if form_field == 'familyHistory':
+                        feature_value = 1 if raw_value == 'yes' else 0
+                    elif form_field == 'physicalActivity':
+                        feature_value = 1 if raw_value == 'low' else 0
+                    elif form_field in ['prenatalLoss', 'birthDefects', 'pcos', 'prediabetes']:
+                        feature_value = 1 if raw_value == 'yes' else 0
+                    else:
+                        # Convert numeric strings to float
+                        feature_value = float(raw_value)
+                break
+        
+        if feature_value is None:
+            # Use default values if not provided
+            if feature == 'Family History':
+                feature_value = 0  # Default: no family history
+            elif feature == 'unexplained prenetal loss':
+                feature_value = 0  # Default: no
+            elif feature == 'Large Child or Birth Default':
+                feature_value = 0  # Default: no
+            elif feature == 'PCOS':
+                feature_value = 0  # Default: no
+            elif feature == 'Sedentary Lifestyle':
+                feature_value = 0  # Default: not sedentary
+            elif feature == 'Prediabetes':
+                feature_value = 0  # Default: no
+            else:
+                raise ValueError(f'Missing required feature: {feature}')
+                
+        patient_data.append(feature_value)
+
+    return np.array(patient_data).reshape(1, -1)
+
+def describe(prediction_value, bundle):
+    """Build the response for a Non-GDM probability"""
+    is_diabetic = prediction_value < 0.5
+    
+    # Calculate risk level based on prediction
+    risk_level = "high" if prediction_value < 0.3 else "moderate" if prediction_value < 0.7 else "low"
+    confidence = round((1 - prediction_value) * 100 if is_diabetic else prediction_value * 100, 1)
+    
+    return {
+        'prediction': 'GDM' if is_diabetic else 'Non-GDM',
+        'isDiabetic': is_diabetic,
+        'confidence': confidence,
+        'risk': risk_level,
+        'rawPrediction': prediction_value,
+        'modelVersion': bundle.version
+    }
+
+# Serve the active registry version, falling back to the files in the working directory
+if MODEL_KIND == 'tabular':
+    served_model = ServedModel(MODEL_NAME, load_tabular_artifacts,
+                               legacy_files={'model': TABULAR_MODEL_PATH}, warmup=warm_up)
+else:
+    served_model = ServedModel(MODEL_NAME, load_artifacts,
+                               legacy_files={'model': MODEL_PATH, 'scaler': SCALER_PATH},
+                               warmup=warm_up)
+start_serving(served_model)
+add_admin_routes(app, [served_model])
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Endpoint to check if the service is running"""
+    if served_model.current() is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Model not loaded',
+            'model': served_model.status()
+        }), 503
+
+    return jsonify({
+        'status': 'healthy',
+        'model_loaded': True,
+        'model_kind': MODEL_KIND,
+        'model_version': served_model.version,
+        'model': served_model.status(),
+        'worker': worker_settings
+    })
 
 @app.route('/predict', methods=['POST'])
 def predict():
+    start_time = time.time()
+
+    # Hold on to this version for the whole request, even if a reload swaps it
+    bundle = served_model.current()
+    if bundle is None:
+        logger.error("Prediction attempted but model is not loaded", extra={'route': ROUTE})
+        return jsonify({'error': 'Model not loaded'}), 503
+
     try:
         data = request.json
-        print("Received data:", data)
+        logger.debug("Received prediction request", extra={'route': ROUTE, 'request': data})
         
         # Transform form data to model input format
-        patient_data = []
-        
-        for feature in feature_names:
-            feature_value = None
-            
-            # Find the corresponding form field
-            for form_field, mapped_feature in form_to_feature_mapping.items():
-                if mapped_feature == feature:
-                    # Get value from request data
-                    if form_field in data:
-                        raw_value = data[form_field]
-                        
-                        # Convert string values to numeric
-                        if form_field == 'familyHistory':
-                            feature_value = 1 if raw_value == 'yes' else 0
-                        elif form_field == 'physicalActivity':
-                            feature_value = 1 if raw_value == 'low' else 0
-                        elif form_field in ['prenatalLoss', 'birthDefects', 'pcos', 'prediabetes']:
-                            feature_value = 1 if raw_value == 'yes' else 0
-                        else:
-                            # Convert numeric strings to float
-                            feature_value = float(raw_value)
-                    break
-            
-            if feature_value is None:
-                # Use default values if not provided
-                if feature == 'Family History':
-                    feature_value = 0  # Default: no family history
-                elif feature == 'unexplained prenetal loss':
-                    feature_value = 0  # Default: no
-                elif feature == 'Large Child or Birth Default':
-                    feature_value = 0  # Default: no
-                elif feature == 'PCOS':
-                    feature_value = 0  # Default: no
-                elif feature == 'Sedentary Lifestyle':
-                    feature_value = 0  # Default: not sedentary
-                elif feature == 'Prediabetes':
-                    feature_value = 0  # Default: no
-                else:
-                    return jsonify({'error': f'Missing required feature: {feature}'}), 400
-                    
-            patient_data.append(feature_value)
-        
-        print("Processed patient data:", patient_data)
-        
-        # Reshape data for model input
-        patient_data = np.array(patient_data).reshape(1, -1)
-        
-        # Preprocess patient data
-        patient_scaled = scaler.transform(patient_data)
-        
-        # Prepare for CNN input
-        num_features = patient_scaled.shape[1]
-        image_size = int(np.ceil(np.sqrt(num_features)))
-        if image_size < 8:
-            image_size = 8
-            
-        padded = np.zeros((1, image_size**2))
-        padded[:, :num_features] = patient_scaled
-        
-        patient_cnn_input = padded.reshape(-1, image_size, image_size, 1).astype(np.float32)
+        try:
+            patient_data = encode_form(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.debug("Processed patient data", extra={'route': ROUTE, 'features': patient_data.ravel().tolist()})
         
         # Predict
-        prediction = model.predict(patient_cnn_input)
-        
-        prediction_value = float(prediction[0][0])
-        is_diabetic = prediction_value < 0.5
-        
-        # Calculate risk level based on prediction
-        risk_level = "high" if prediction_value < 0.3 else "moderate" if prediction_value < 0.7 else "low"
-        confidence = round((1 - prediction_value) * 100 if is_diabetic else prediction_value * 100, 1)
-        
-        result = {
-            'prediction': 'GDM' if is_diabetic else 'Non-GDM',
-            'isDiabetic': is_diabetic,
-            'confidence': confidence,
-            'risk': risk_level,
-            'rawPrediction': float(prediction[0][0])
-        }
+        prediction_value = score(bundle, patient_data)
+        result = describe(prediction_value, bundle)
         
-        print("Prediction result:", result)
+        logger.info("Prediction completed", extra={
+            'route': ROUTE,
+            'model_version': bundle.version,
+            'duration_ms': round((time.time() - start_time) * 1000, 1),
+            'prediction': result['prediction'],
+            'confidence': result['confidence']
+        })
         return jsonify(result), 200
         
     except Exception as e:
-        print("Error during prediction:", str(e))
+        logger.error(f"Error during prediction: {type(e).__name__}", exc_info=True, extra={'route': ROUTE})
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
@@ -0,0 +1,192 @@
+# predict_combined.py
+#
+# One request for a full assessment: the clinical form and the ECG image are
+# scored concurrently on a shared executor and their GDM probabilities are
+# fused into a single risk. Invalid input in either branch is a 400. Each branch
+# has its own timeout; when one branch's model fails or times out the response
+# is built from the other and marked degraded.
+#
+#   COMBINED_WEIGHTS       fusion weights, e.g. clinical=0.6,ecg=0.4 (default equal)
+#   COMBINED_WORKERS       executor threads shared by all requests (default 4)
+#   CLINICAL_TIMEOUT       seconds allowed for the clinical branch (default 5)
+#   ECG_TIMEOUT            seconds allowed for the ECG branch (default 10)
+#
+# The models are the ones predict_clinical.py and predict_image.py serve,
+# including their registry versions and admin reloads. Only the ECG model
+# (ecg_model.py) is imported, not the ECG service with its bulk jobs and
+# experiments.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+import predict_clinical
+import ecg_model
+from structured_logging import configure_logging
+from model_registry import add_admin_routes
+from model_experiments import parse_split
+
+# Configure logging
+logger = configure_logging('combined-assessment')
+ROUTE = '/assess'
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+
+WEIGHTS = parse_split(os.getenv('COMBINED_WEIGHTS', 'clinical=0.5,ecg=0.5'))
+TIMEOUTS = {
+    'clinical': float(os.getenv('CLINICAL_TIMEOUT', '5')),
+    'ecg': float(os.getenv('ECG_TIMEOUT', '10')),
+}
+executor = ThreadPoolExecutor(max_workers=int(os.getenv('COMBINED_WORKERS', '4')),
+                              thread_name_prefix='assess')
+
+add_admin_routes(app, [predict_clinical.served_model, ecg_model.served_model])
+
+def prepare_inputs(data):
+    """
+    Encode the clinical form and decode the image before anything is scored.
+    Returns {branch: model input}; raises ValueError for invalid client input,
+    which is a 400 rather than a degraded branch.
+    """
+    prepared = {}
+    if data.get('clinical'):
+        prepared['clinical'] = predict_clinical.encode_form(data['clinical'])
+    if data.get('image'):
+        try:
+            prepared['ecg'] = ecg_model.decode_image_payload(data['image'])
+        except Exception:
+            raise ValueError('Invalid image format')
+    return prepared
+
+def run_clinical(patient_data):
+    """Score an encoded clinical form; returns the /predict response"""
+    bundle = predict_clinical.served_model.current()
+    if bundle is None:
+        raise RuntimeError('Clinical model not loaded')
+    return predict_clinical.describe(predict_clinical.score(bundle, patient_data), bundle)
+
+def run_ecg(img_array):
+    """Score a decoded ECG image with the primary model; returns the /predict-ecg response"""
+    served = ecg_model.served_model
+    bundle = served.current()
+    if bundle is None:
+        raise RuntimeError('ECG model not loaded')
+    predicted_class, confidence, raw_prediction = ecg_model.classify(bundle, img_array)
+    return ecg_model.describe(predicted_class, confidence, raw_prediction, served, bundle)
+
+def gdm_probability(name, result):
+    """Probability of GDM from a branch result (the clinical model outputs P(Non-GDM))"""
+    if name == 'clinical':
+        return 1.0 - result['rawPrediction']
+    return result['rawPrediction']
+
+def fuse(probabilities):
+    """Weighted mean of the branch probabilities, renormalized over the branches that answered"""
+    weights = {name: WEIGHTS.get(name, 0.0) for name in probabilities}
+    total = sum(weights.values())
+    if total <= 0:
+        weights = {name: 1.0 for name in probabilities}
+        total = float(len(probabilities))
+    probability = sum(weights[name] * p for name, p in probabilities.items()) / total
+    is_diabetic = probability >= 0.5
+    return {
+        'prediction': 'GDM' if is_diabetic else 'Non-GDM',
+        'isDiabetic': is_diabetic,
+        'probability': round(probability, 4),
+        'confidence': round(max(probability, 1 - probability) * 100, 1),
+        'risk': "high" if probability > 0.7 else "moderate" if probability > 0.3 else "low",
+        'weights': {name: round(weights[name] / total, 4) for name in probabilities},
+    }
+
+def _timed(fn, argument, submitted):
+    started = time.perf_counter()
+    result = fn(argument)
+    return result, (started - submitted) * 1000, (time.perf_counter() - started) * 1000
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Endpoint to check if the service is running"""
+    models = {
+        'clinical': predict_clinical.served_model.status(),
+        'ecg': ecg_model.served_model.status(),
+    }
+    loaded = [name for name, served in (('clinical', predict_clinical.served_model),
+                                        ('ecg', ecg_model.served_model))
+              if served.current() is not None]
+    return jsonify({
+        'status': 'healthy' if len(loaded) == 2 else 'degraded' if loaded else 'error',
+        'models_loaded': loaded,
+        'models': models,
+        'worker': predict_clinical.worker_settings
+    }), 200 if loaded else 503
+
+@app.route('/assess', methods=['POST'])
+def assess():
+    """Score the clinical form and the ECG image concurrently and fuse the results"""
+    start = time.perf_counter()
+    data = request.get_json(silent=True) or {}
+    try:
+        inputs = prepare_inputs(data)
+    except ValueError as e:
+        # Bad input is the client's error, like /predict and /predict-ecg; only model
+        # failures and timeouts degrade the assessment
+        logger.warning(f"Invalid assessment input: {type(e).__name__}", extra={'route': ROUTE})
+        return jsonify({'error': str(e)}), 400
+    if not inputs:
+        logger.warning("Assessment request has neither clinical data nor an image", extra={'route': ROUTE})
+        return jsonify({'error': "Provide 'clinical' form data and/or an 'image'"}), 400
+
+    branch_fns = {'clinical': run_clinical, 'ecg': run_ecg}
+    futures = {name: executor.submit(_timed, branch_fns[name], value, time.perf_counter())
+               for name, value in inputs.items()}
+
+    branches = {name: {'status': 'skipped'} for name in branch_fns if name not in inputs}
+    probabilities = {}
+    for name, future in futures.items():
+        # Timeouts count from the start of the request, since both branches run at once
+        remaining = TIMEOUTS[name] - (time.perf_counter() - start)
+        try:
+            result, wait_ms, duration_ms = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            future.cancel()  # only takes effect if the branch hasn't started yet
+            branches[name] = {'status': 'timeout', 'timeoutSeconds': TIMEOUTS[name]}
+            logger.warning(f"{name} branch timed out after {TIMEOUTS[name]}s", extra={'route': ROUTE})
+            continue
+        except Exception as e:
+            branches[name] = {'status': 'error', 'error': str(e)}
+            logger.warning(f"{name} branch failed: {type(e).__name__}", extra={'route': ROUTE})
+            continue
+        branches[name] = {
+            'status': 'ok',
+            'waitMs': round(wait_ms, 1),
+            'durationMs': round(duration_ms, 1),
+            'result': result
+        }
+        probabilities[name] = gdm_probability(name, result)
+
+    total_ms = round((time.perf_counter() - start) * 1000, 1)
+    if not probabilities:
+        logger.error("Assessment failed in every branch", extra={'route': ROUTE, 'duration_ms': total_ms})
+        return jsonify({'error': 'No branch produced a prediction', 'branches': branches,
+                        'durationMs': total_ms}), 503
+
+    result = fuse(probabilities)
+    result['degraded'] = len(probabilities) < len(futures)
+    result['branches'] = branches
+    result['durationMs'] = total_ms
+
+    logger.info("Assessment completed", extra={
+        'route': ROUTE,
+        'duration_ms': total_ms,
+        'degraded': result['degraded'],
+        'branches': {name: branch['status'] for name, branch in branches.items()},
+        'prediction': result['prediction'],
+        'confidence': result['confidence']
+    })
+    return jsonify(result), 200
+
+if __name__ == '__main__':
+    logger.info("Starting combined assessment service on port 5003")
+    app.run(host='0.0.0.0', port=5003, threaded=True)
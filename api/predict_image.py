@@ -1,53 +1,94 @@
 
 import os
+from worker_config import worker_index
+from ecg_model import (
+    worker_settings, served_model, load_artifacts, warm_up, load_ecg_image, classify,
+    decode_image_payload, describe, MODEL_NAME, MODEL_PATH
+)
+
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import base64
-import io
-import logging
 import time
+import uuid
+from structured_logging import configure_logging
+from model_registry import ServedModel, start_serving, add_admin_routes
+from model_experiments import (
+    ModelExperiment, ExperimentStore, add_experiment_routes, parse_names, parse_split
+)
+from ecg_jobs import JobManager, add_job_routes
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger('ecg-predictor')
+logger = configure_logging('ecg-predictor')
+ROUTE = '/predict-ecg'
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Constants
-IMG_HEIGHT = 224
-IMG_WIDTH = 224
-MODEL_PATH = 'diabetes_cnn_model.keras'
+# Alternative architectures (e.g. build_cnn_lstm_model) published to the registry
+# under their own names, run as shadows and/or A/B split against the primary:
+#   ECG_SHADOW_MODELS=ecg-cnn-lstm,ecg-cnn-rnn
+#   ECG_AB_SPLIT=ecg=0.9,ecg-cnn-lstm=0.1
+shadow_names = parse_names(os.getenv('ECG_SHADOW_MODELS'))
+ab_split = parse_split(os.getenv('ECG_AB_SPLIT'))
+variants = {}
+for name in dict.fromkeys(shadow_names + list(ab_split)):
+    if name != MODEL_NAME:
+        variants[name] = ServedModel(name, load_artifacts, legacy_files=None, warmup=warm_up)
+        start_serving(variants[name])
+
+experiment = ModelExperiment(
+    served_model, variants, classify,
+    shadows=shadow_names,
+    split=ab_split,
+    store=ExperimentStore(os.getenv('ECG_EXPERIMENT_DB', 'ecg_experiments.sqlite'))
+          if shadow_names or ab_split else None,
+    shadow_workers=int(os.getenv('ECG_SHADOW_WORKERS', '1'))
+)
+
+add_admin_routes(app, experiment.served_models())
+add_experiment_routes(app, experiment)
+
+def score_batch(images):
+    """Score a batch of decoded images with the primary model, for bulk jobs"""
+    bundle = served_model.current()
+    if bundle is None:
+        raise RuntimeError('Model not loaded')
+    predictions = np.asarray(bundle['model'].predict_on_batch(np.stack(images)))
+    rows = []
+    for prediction in predictions:
+        predicted_class = int(np.argmax(prediction))
+        rows.append({
+            'prediction': 'Diabetic' if predicted_class == 0 else 'Non-Diabetic',
+            'is_diabetic': predicted_class == 0,
+            'confidence': round(float(prediction[predicted_class]) * 100, 2),
+            'raw_prediction': float(prediction[0]),
+            'model_version': bundle.version
+        })
+    return rows
 
-# Load model once at startup
-logger.info("Loading ECG prediction model...")
-try:
-    model = load_model(MODEL_PATH)
-    logger.info(f"Model loaded successfully from {MODEL_PATH}")
-except Exception as e:
-    logger.error(f"Error loading model: {str(e)}")
-    model = None
+# Bulk scoring of zip archives and server-side directories
+# With several workers (serve.py) only the first resumes interrupted jobs
+job_manager = JobManager(load_ecg_image, score_batch, resume=worker_index() == 0)
+add_job_routes(app, job_manager)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint to check if the service is running"""
-    if model is None:
+    if served_model.current() is None:
         return jsonify({
             'status': 'error',
-            'message': 'Model not loaded'
+            'message': 'Model not loaded',
+            'model': served_model.status()
         }), 503
     
     return jsonify({
         'status': 'healthy',
         'model_loaded': True,
-        'model_path': MODEL_PATH
+        'model_path': MODEL_PATH,
+        'model_version': served_model.version,
+        'model': served_model.status(),
+        'worker': worker_settings
     })
 
 @app.route('/predict-ecg', methods=['POST'])
@@ -55,72 +96,52 @@ def predict_ecg():
     """Endpoint to predict diabetes from ECG image"""
     start_time = time.time()
     
-    if model is None:
-        logger.error("Prediction attempted but model is not loaded")
+    # A/B routing picks the serving model; sticky per X-Experiment-Key if sent
+    served = experiment.choose(request.headers.get('X-Experiment-Key'))
+    if served.current() is None:
+        logger.error("Prediction attempted but model is not loaded", extra={'route': ROUTE})
         return jsonify({'error': 'Model not loaded'}), 503
         
     if 'image' not in request.json:
-        logger.warning("Prediction request missing image data")
+        logger.warning("Prediction request missing image data", extra={'route': ROUTE})
         return jsonify({'error': 'No image data provided'}), 400
         
     try:
-        # Get the base64 string from the request
-        image_b64 = request.json['image']
-        
-        # Remove the header if it exists (e.g., "data:image/jpeg;base64,")
-        if ',' in image_b64:
-            image_b64 = image_b64.split(',')[1]
-            
-        # Decode the base64 string
-        image_data = base64.b64decode(image_b64)
-        
-        # Load and preprocess the image
+        # Decode and preprocess the image
         try:
-            img = image.load_img(io.BytesIO(image_data), target_size=(IMG_HEIGHT, IMG_WIDTH))
+            img_array = decode_image_payload(request.json['image'])
         except Exception as e:
-            logger.error(f"Error loading image: {str(e)}")
+            logger.error(f"Error loading image: {type(e).__name__}", extra={'route': ROUTE})
             return jsonify({'error': 'Invalid image format'}), 400
-            
-        # Preprocess the image
-        img_array = image.img_to_array(img)
-        img_array = img_array / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Make prediction
-        prediction = model.predict(img_array)
-        
-        # Get prediction results
-        predicted_class = int(np.argmax(prediction[0]))  # Convert numpy int to Python int
-        confidence = float(prediction[0][predicted_class])  # Convert numpy float to Python float
-        is_diabetic = bool(predicted_class == 0)  # Convert to Python bool
         
-        # Determine risk level
-        if is_diabetic:
-            if confidence > 0.85:
-                risk = 'high'
-            elif confidence > 0.7:
-                risk = 'moderate'
-            else:
-                risk = 'moderate'
-        else:
-            risk = 'low'
+        # Make prediction, holding on to this version even if a reload swaps it
+        bundle, (predicted_class, confidence, raw_prediction), latency_ms, cpu_ms = \
+            experiment.run(served, img_array)
+        result = describe(predicted_class, confidence, raw_prediction, served, bundle)
         
-        # Create response - ensuring all values are JSON serializable
-        result = {
-            'prediction': 'Diabetic' if is_diabetic else 'Non-Diabetic',
-            'isDiabetic': is_diabetic,
-            'confidence': round(confidence * 100, 2),
-            'risk': risk,
-            'rawPrediction': float(prediction[0][0])  # Convert numpy float to Python float
-        }
+        # Record the serving model and hand the image to any shadow models
+        if experiment.enabled:
+            request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+            role = 'primary' if served is served_model else 'ab'
+            experiment.record(request_id, served, bundle, role, latency_ms, cpu_ms,
+                              predicted_class, confidence)
+            if served is served_model:
+                experiment.submit_shadows(request_id, img_array, predicted_class)
         
         processing_time = time.time() - start_time
-        logger.info(f"Prediction completed in {processing_time:.2f}s: {result['prediction']} with {result['confidence']}% confidence")
+        logger.info("Prediction completed", extra={
+            'route': ROUTE,
+            'model': served.name,
+            'model_version': bundle.version,
+            'duration_ms': round(processing_time * 1000, 1),
+            'prediction': result['prediction'],
+            'confidence': result['confidence']
+        })
         
         return jsonify(result)
         
     except Exception as e:
-        logger.error(f"Prediction error: {str(e)}", exc_info=True)
+        logger.error(f"Prediction error: {type(e).__name__}", exc_info=True, extra={'route': ROUTE})
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+# serve.py
+#
+# Run several worker processes of one service on a single port. Each worker
+# binds its own SO_REUSEPORT socket, so the kernel spreads connections across
+# them, and gets its share of the CPU budget from worker_config.py before it
+# imports TensorFlow.
+#
+#   python serve.py predict_image --port 5001 --workers 4 --threads 2 --pin
+#   python serve.py predict_clinical --port 5000 --workers 2
+#
+# Without --threads each worker gets the CPU budget divided by --workers.
+
+import os
+import sys
+import time
+import json
+import signal
+import socket
+import argparse
+import subprocess
+from worker_config import plan
+
+def run_worker(module_name, host, port):
+    """Body of one worker process: configure threads, import the service, serve"""
+    from worker_config import configure_worker
+    configure_worker()
+    from werkzeug.serving import make_server
+    module = __import__(module_name)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    make_server(host, port, module.app, threaded=True, fd=sock.fileno()).serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a prediction service as several CPU-budgeted workers')
+    parser.add_argument('module', help='Service module, e.g. predict_image')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WORKER_COUNT', '1')))
+    parser.add_argument('--threads', type=int, help='Threads per worker (default: budget / workers)')
+    parser.add_argument('--pin', action='store_true', help='Pin each worker to its own cores')
+    parser.add_argument('--worker-index', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker_index is not None:
+        run_worker(args.module, args.host, args.port)
+        return 0
+
+    settings = plan(args.workers, args.threads, args.pin)
+    print(json.dumps(settings), flush=True)
+
+    procs = []
+    for index in range(settings['workers']):
+        env = dict(os.environ)
+        env.update({
+            'WORKER_COUNT': str(settings['workers']),
+            'WORKER_THREADS': str(settings['threads_per_worker']),
+            'WORKER_INDEX': str(index),
+            'WORKER_PIN': '1' if args.pin else '0',
+        })
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), args.module, '--host', args.host,
+             '--port', str(args.port), '--worker-index', str(index)], env=env))
+
+    def stop(*_):
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # A worker that dies takes the others down so a supervisor restarts the whole set
+        while all(proc.poll() is None for proc in procs):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return max((proc.returncode or 0 for proc in procs), default=0)
+
+if __name__ == '__main__':
+    sys.exit(main())
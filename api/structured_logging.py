@@ -0,0 +1,173 @@
+# structured_logging.py
+#
+# JSON logging shared by the API services. Records are handed to a queue on the
+# request thread and written by a background listener, so a slow stdout never
+# blocks inference. Records tagged with a route can be sampled per route,
+# clinical fields and results attached to a record are redacted before they are
+# written, and tracebacks leave out exception messages.
+#
+# Environment variables:
+#   LOG_LEVEL          minimum level (default INFO)
+#   LOG_ENABLED        set to 0 to disable logging entirely
+#   LOG_SAMPLE_RATES   per-route sampling, e.g. "/predict=0.1,/chat=0.5"
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+from clinical_features import feature_names, form_to_feature_mapping
+
+REDACTED = '[REDACTED]'
+
+# Model results for one patient
+PREDICTION_FIELDS = ['prediction', 'isDiabetic', 'confidence', 'risk', 'rawPrediction', 'probability']
+
+# Record fields that carry patient data
+DEFAULT_REDACT_FIELDS = frozenset(
+    list(form_to_feature_mapping) + feature_names + ['features', 'image'] + PREDICTION_FIELDS
+)
+
+# Standard LogRecord attributes, everything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_formatter = None
+
+def redact(value, fields):
+    """Return a copy of value with any dict keys in fields replaced by REDACTED"""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in fields else redact(v, fields) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, fields) for v in value]
+    return value
+
+def format_exception(exc_info):
+    """
+    Traceback with the exception type but not its message, which can echo
+    request values (e.g. "could not convert string to float: '...'")
+    """
+    exc_type, _, tb = exc_info
+    return ('Traceback (most recent call last):\n' + ''.join(traceback.format_tb(tb))
+            + f'{exc_type.__module__}.{exc_type.__qualname__}: [message redacted]')
+
+def parse_sample_rates(spec):
+    """Parse "route=rate,route=rate" into a dict of floats"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        route, rate = item.split('=', 1)
+        rates[route.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line. A record is tagged with the
+    service whose logger (or an ancestor of it) wrote it; records from other
+    loggers get the most recently added service.
+    """
+
+    def __init__(self, service, redact_fields=DEFAULT_REDACT_FIELDS):
+        super().__init__()
+        self.services = [service]
+        self.redact_fields = redact_fields
+
+    def add_service(self, service):
+        if service in self.services:
+            self.services.remove(service)
+        self.services.append(service)
+
+    def service_for(self, name):
+        while name:
+            if name in self.services:
+                return name
+            name = name.rpartition('.')[0]
+        return self.services[-1]
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                    + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'service': self.service_for(record.name),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = REDACTED if key in self.redact_fields else redact(value, self.redact_fields)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RouteSamplingFilter(logging.Filter):
+    """Keeps a fraction of INFO/DEBUG records tagged with a `route` attribute"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, 'route', None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that defers JSON formatting to the listener thread"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = format_exception(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(service, sample_rates=None, redact_fields=DEFAULT_REDACT_FIELDS):
+    """
+    Route all logging through a non-blocking JSON queue handler and return the
+    logger for service. Safe to call from several services in one process; the
+    first call installs the handler and later calls register their service name.
+    """
+    global _listener, _formatter
+    logger = logging.getLogger(service)
+    if _listener is not None:
+        _formatter.add_service(service)
+        return logger
+
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))
+
+    output = logging.StreamHandler(sys.stdout)
+    _formatter = JsonFormatter(service, redact_fields)
+    output.setFormatter(_formatter)
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RouteSamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    set_logging_enabled(os.getenv('LOG_ENABLED', '1') not in ('0', 'false', 'no'))
+    return logger
+
+def set_logging_enabled(enabled):
+    """Turn all logging on or off at runtime"""
+    logging.disable(logging.NOTSET if enabled else logging.CRITICAL)
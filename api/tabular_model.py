@@ -0,0 +1,136 @@
+# tabular_model.py
+#
+# NumPy-only inference for the tabular clinical models trained by
+# train_clinical_tabular.py. A model is a single .npz file that takes the raw
+# 15-feature rows (in clinical_features.feature_names order) and returns the
+# same probability the clinical CNN outputs: P(class 1 = Non-GDM).
+#
+# Two kinds are supported:
+#   linear  logistic regression with the StandardScaler folded into the weights
+#   trees   gradient-boosted regression trees padded to complete binary trees of
+#           the same depth, evaluated level by level for all rows and trees at
+#           once. Tens to hundreds of thousands of rows per second; the linear
+#           kind is the one that scores millions of rows per second.
+
+import numpy as np
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+class TabularModel:
+    """A loaded tabular model; predict_proba is vectorized over rows"""
+
+    def __init__(self, kind, arrays):
+        self.kind = kind
+        self.arrays = arrays
+        if kind == 'linear':
+            self.weights = arrays['weights']
+            self.bias = float(arrays['bias'])
+        elif kind == 'trees':
+            self.feature = arrays['feature']
+            self.threshold = arrays['threshold']
+            self.leaf_value = arrays['leaf_value']
+            self.depth = int(arrays['depth'])
+            self.init = float(arrays['init'])
+            self.learning_rate = float(arrays['learning_rate'])
+            # Flattened copies: 1-D takes are much cheaper than 2-D fancy indexing
+            num_trees, num_internal = self.feature.shape
+            self._internal_offsets = (np.arange(num_trees, dtype=np.int64) * num_internal)[None, :]
+            self._leaf_offsets = (np.arange(num_trees, dtype=np.int64) * (num_internal + 1))[None, :]
+            self._feature = self.feature.astype(np.int64).ravel()
+            self._threshold = self.threshold.ravel()
+            self._leaf_value = self.leaf_value.ravel()
+        else:
+            raise ValueError(f"Unknown tabular model kind: {kind}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(str(arrays.pop('kind')), arrays)
+
+    def save(self, path):
+        np.savez(path, kind=np.array(self.kind), **self.arrays)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+    def decision_function(self, X, chunk_size=1024):
+        X = np.asarray(X, dtype=np.float32)
+        if self.kind == 'linear':
+            return X @ self.weights + self.bias
+        return np.concatenate([self._trees_raw(X[i:i + chunk_size])
+                               for i in range(0, len(X), chunk_size)]) if len(X) else np.zeros(0)
+
+    def _trees_raw(self, X):
+        # Heap layout: children of internal node i are 2i+1 and 2i+2, so after
+        # `depth` steps every row sits on a leaf of every tree
+        num_rows, num_features = X.shape
+        row_offsets = (np.arange(num_rows, dtype=np.int64) * num_features)[:, None]
+        X_flat = X.ravel()
+        position = np.zeros((num_rows, self._internal_offsets.shape[1]), dtype=np.int64)
+        for _ in range(self.depth):
+            node = position + self._internal_offsets
+            go_right = X_flat.take(row_offsets + self._feature.take(node)) > self._threshold.take(node)
+            position = 2 * position + 1 + go_right
+        leaves = position - self.feature.shape[1] + self._leaf_offsets
+        return self.init + self.learning_rate * self._leaf_value.take(leaves).sum(axis=1)
+
+    def predict_proba(self, X):
+        """Probability of class 1 (Non-GDM) for each row"""
+        return _sigmoid(self.decision_function(X))
+
+def export_linear(scaler, classifier):
+    """Fold a fitted StandardScaler into a fitted binary LogisticRegression"""
+    coef = classifier.coef_[0] / scaler.scale_
+    bias = classifier.intercept_[0] - np.dot(coef, scaler.mean_)
+    return TabularModel('linear', {
+        'weights': coef.astype(np.float32),
+        'bias': np.float32(bias),
+    })
+
+def export_gradient_boosting(classifier, X_reference):
+    """
+    Pad a fitted binary GradientBoostingClassifier into complete trees.
+    X_reference is any one row, used to recover the model's initial log-odds.
+    """
+    trees = [estimator[0].tree_ for estimator in classifier.estimators_]
+    depth = max(tree.max_depth for tree in trees)
+    num_internal, num_leaves = 2**depth - 1, 2**depth
+
+    feature = np.zeros((len(trees), num_internal), dtype=np.int32)
+    # float64 like sklearn, compared against float32 inputs exactly as sklearn does.
+    # An early leaf becomes +inf splits, so every row goes left down to a copy of it.
+    threshold = np.full((len(trees), num_internal), np.inf, dtype=np.float64)
+    leaf_value = np.zeros((len(trees), num_leaves), dtype=np.float32)
+
+    for t, tree in enumerate(trees):
+        stack = [(0, 0, 0)]  # (sklearn node, heap position, level)
+        while stack:
+            node, position, level = stack.pop()
+            is_leaf = tree.children_left[node] == -1
+            if level == depth:
+                leaf_value[t, position - num_internal] = tree.value[node, 0, 0]
+                continue
+            if is_leaf:
+                stack.append((node, 2 * position + 1, level + 1))
+                stack.append((node, 2 * position + 2, level + 1))
+                continue
+            feature[t, position] = tree.feature[node]
+            threshold[t, position] = tree.threshold[node]
+            stack.append((tree.children_left[node], 2 * position + 1, level + 1))
+            stack.append((tree.children_right[node], 2 * position + 2, level + 1))
+
+    x0 = np.asarray(X_reference, dtype=np.float64).reshape(1, -1)
+    tree_sum = sum(estimator[0].predict(x0)[0] for estimator in classifier.estimators_)
+    init = classifier.decision_function(x0)[0] - classifier.learning_rate * tree_sum
+
+    return TabularModel('trees', {
+        'feature': feature,
+        'threshold': threshold,
+        'leaf_value': leaf_value,
+        'depth': np.int32(depth),
+        'init': np.float64(init),
+        'learning_rate': np.float64(classifier.learning_rate),
+    })
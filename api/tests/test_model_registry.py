@@ -0,0 +1,27 @@
+from model_registry import LEGACY_VERSION, ServedModel, active_version, publish, set_active
+
+def read_text(paths):
+    with open(paths['model']) as f:
+        return {'model': f.read()}
+
+def test_publish_without_activate_keeps_serving_version(tmp_path):
+    legacy = tmp_path / 'legacy.txt'
+    legacy.write_text('legacy')
+    registry = str(tmp_path / 'registry')
+    served = ServedModel('clinical', read_text, legacy_files={'model': str(legacy)}, registry_dir=registry)
+    served.reload()
+    assert served.version == LEGACY_VERSION
+
+    for content in ('first', 'second'):
+        artifact = tmp_path / f'{content}.txt'
+        artifact.write_text(content)
+        publish('clinical', {'model': str(artifact)}, registry_dir=registry)
+        assert active_version('clinical', registry) is None
+        served.reload()
+        assert served.version == LEGACY_VERSION
+        assert served.current()['model'] == 'legacy'
+
+    set_active('clinical', 'v2', registry)
+    served.reload()
+    assert served.version == 'v2'
+    assert served.current()['model'] == 'second'
@@ -0,0 +1,283 @@
+# train_clinical_incremental.py
+#
+# Update the clinical CNN with a new cohort of labeled patients instead of
+# retraining it from scratch. Starting from the active 'clinical' registry
+# version (or clinical_cnn_model.keras), this script:
+#
+#   - reads only the cohort files given with --data and keeps the rows whose
+#     Case Number the base version has not seen
+#   - updates the scaler's running mean/variance with those rows (partial_fit)
+#   - fine-tunes the base model on the new rows plus a replay sample of older
+#     training rows, at a low learning rate
+#   - validates against the held-out rows of every cohort so far and only
+#     publishes a new 'clinical' version when it is no worse than the base
+#
+# What it needs to know about earlier data (seen ids, a replay reservoir and
+# the held-out rows) is published with each version as its 'training_state'
+# artifact. The first run builds it from the original dataset.
+#
+#   python train_clinical_incremental.py --data clinical_data/cohort_2025_03.xlsx
+#   python train_clinical_incremental.py --data cohort.xlsx --compare-full --activate
+
+import os
+import copy
+import math
+import time
+import zlib
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from clinical_features import feature_names, to_cnn_input, DATASET_PATH, ID_COLUMN, TARGET_COLUMN
+from model_registry import active_version, resolve_artifacts, publish, list_versions, read_manifest
+
+MODEL_NAME = 'clinical'
+LEGACY_FILES = {'model': 'clinical_cnn_model.keras', 'scaler': 'clinical_scaler.pkl'}
+
+def normalize_ids(values):
+    """
+    Case ids as strings, with whole numbers written as integers: a case number
+    read as 1, 1.0 or "1.0" (float columns in CSV, NaN-padded xlsx) is "1"
+    """
+    values = pd.Series(values, dtype=object)
+    numeric = pd.to_numeric(values, errors='coerce')
+    whole = numeric.notna() & (numeric % 1 == 0)
+    ids = values.astype(str).str.strip()
+    ids[whole] = numeric[whole].astype(np.int64).astype(str)
+    return ids.to_numpy(dtype=str)
+
+def read_rows(paths):
+    """Raw feature rows (NaN where missing), labels and case ids from .xlsx/.csv files"""
+    frames = [pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path) for path in paths]
+    df = pd.concat(frames, ignore_index=True)
+    missing = [col for col in [ID_COLUMN, TARGET_COLUMN] + feature_names if col not in df.columns]
+    if missing:
+        raise SystemExit(f"Missing columns in {', '.join(paths)}: {missing}")
+    df[ID_COLUMN] = normalize_ids(df[ID_COLUMN])
+    df = df.drop_duplicates(subset=ID_COLUMN, keep='last')
+    X = df[feature_names].to_numpy(dtype=np.float64)
+    return X, df[TARGET_COLUMN].to_numpy(dtype=np.int64), df[ID_COLUMN].to_numpy(dtype=str)
+
+def prepare(scaler, X_raw):
+    """Fill missing values with the scaler's means, scale and pad into CNN images"""
+    X = np.where(np.isnan(X_raw), scaler.mean_, X_raw)
+    return to_cnn_input(scaler.transform(pd.DataFrame(X, columns=feature_names)))
+
+def measure(model, scaler, X_raw, y):
+    if len(y) == 0:
+        return None
+    probabilities = model.predict(prepare(scaler, X_raw), verbose=0)[:, 0]
+    return {
+        'rows': int(len(y)),
+        'accuracy': round(float(np.mean((probabilities >= 0.5).astype(int) == y)), 4),
+        'roc_auc': round(float(roc_auc_score(y, probabilities)), 4) if len(np.unique(y)) == 2 else None,
+    }
+
+def is_holdout(ids, percent):
+    """Stable per-patient held-out assignment, so a case never moves between train and validation"""
+    return np.array([zlib.crc32(case.encode()) % 100 < percent for case in ids], dtype=bool)
+
+def bootstrap_state(scaler, path, replay_size, rng):
+    """
+    State for a model trained by train_clinical_model.py: the first rows of the
+    dataset the scaler was fitted on, split the same way the script split them.
+    """
+    X, y, ids = read_rows([path])
+    seen = int(np.max(scaler.n_samples_seen_))
+    X, y, ids = X[:seen], y[:seen], ids[:seen]
+    X_train, X_test, y_train, y_test, _, ids_test = train_test_split(
+        X, y, ids, test_size=0.2, random_state=42)
+    keep = rng.choice(len(y_train), size=min(replay_size, len(y_train)), replace=False)
+    return {
+        'seen_ids': ids,
+        'replay_X': X_train[keep], 'replay_y': y_train[keep], 'replay_seen': np.int64(len(y_train)),
+        'holdout_X': X_test, 'holdout_y': y_test, 'holdout_ids': ids_test,
+    }
+
+def update_reservoir(state, X_new, y_new, replay_size, rng):
+    """Reservoir sampling, so the replay rows stay a uniform sample of every training row seen"""
+    replay_X, replay_y = list(state['replay_X']), list(state['replay_y'])
+    seen = int(state['replay_seen'])
+    for row, label in zip(X_new, y_new):
+        if len(replay_X) < replay_size:
+            replay_X.append(row)
+            replay_y.append(label)
+        else:
+            slot = rng.integers(0, seen + 1)
+            if slot < replay_size:
+                replay_X[slot], replay_y[slot] = row, label
+        seen += 1
+    state['replay_X'] = np.array(replay_X).reshape(-1, len(feature_names))
+    state['replay_y'] = np.array(replay_y, dtype=np.int64)
+    state['replay_seen'] = np.int64(seen)
+
+def last_full_retrain(training_rows):
+    """Wall time of the newest measured full retrain in the registry, scaled to training_rows"""
+    for version in reversed(list_versions(MODEL_NAME)):
+        metadata = read_manifest(MODEL_NAME, version).get('metadata', {})
+        if metadata.get('full_retrain_estimated') is False and metadata.get('training_rows'):
+            return metadata['full_retrain_seconds'] * training_rows / metadata['training_rows']
+    return None
+
+parser = argparse.ArgumentParser(description='Warm-start the clinical CNN on a new cohort')
+parser.add_argument('--data', nargs='+', required=True, help='New cohort .xlsx/.csv files')
+parser.add_argument('--base-version', help="Registry version to start from (default: active, else legacy files)")
+parser.add_argument('--epochs', type=int, default=5)
+parser.add_argument('--learning-rate', type=float, default=1e-4)
+parser.add_argument('--batch-size', type=int, default=32)
+parser.add_argument('--replay-ratio', type=float, default=1.0, help='Replay rows per new training row')
+parser.add_argument('--replay-size', type=int, default=2000, help='Rows kept in the replay reservoir')
+parser.add_argument('--holdout-percent', type=int, default=20)
+parser.add_argument('--max-drop', type=float, default=0.01,
+                    help='Largest accuracy/AUC drop versus the base version that is still accepted')
+parser.add_argument('--bootstrap-data', default=DATASET_PATH,
+                    help='Dataset the legacy model was trained on, used when the base has no training state')
+parser.add_argument('--compare-full', action='store_true',
+                    help='Also run a full retrain from scratch and time it')
+parser.add_argument('--full-data', nargs='+', default=[DATASET_PATH],
+                    help='Every earlier cohort, for --compare-full')
+parser.add_argument('--full-epochs', type=int, default=20)
+parser.add_argument('--activate', action='store_true', help='Make the new version active')
+parser.add_argument('--seed', type=int, default=42)
+args = parser.parse_args()
+
+start = time.perf_counter()
+rng = np.random.default_rng(args.seed)
+tf.keras.utils.set_random_seed(args.seed)
+
+# 1. Load Base Version
+base_version = args.base_version or active_version(MODEL_NAME)
+paths = resolve_artifacts(MODEL_NAME, base_version) if base_version else dict(LEGACY_FILES)
+base_model = load_model(paths['model'])
+base_scaler = joblib.load(paths['scaler'])
+if 'training_state' in paths:
+    with np.load(paths['training_state']) as data:
+        state = {key: data[key] for key in data.files}
+else:
+    print(f"No training state for {base_version or 'legacy'} model, building it from {args.bootstrap_data}")
+    state = bootstrap_state(base_scaler, args.bootstrap_data, args.replay_size, rng)
+# States published before ids were normalized may hold "1.0" for case 1
+for key in ('seen_ids', 'holdout_ids'):
+    state[key] = normalize_ids(state[key])
+print(f"Base version: {base_version or 'legacy'}")
+
+# 2. Load New Cohort
+X_cohort, y_cohort, ids_cohort = read_rows(args.data)
+new = ~np.isin(ids_cohort, state['seen_ids'])
+X_new, y_new, ids_new = X_cohort[new], y_cohort[new], ids_cohort[new]
+print(f"Cohort rows: {len(ids_cohort)}, not seen before: {len(ids_new)}")
+if len(ids_new) == 0:
+    raise SystemExit("Nothing to train on: every row has been seen by the base version")
+
+# 3. Update Scaler with the new rows only
+scaler = copy.deepcopy(base_scaler)
+scaler.partial_fit(pd.DataFrame(X_new, columns=feature_names))
+
+# 4. Split New Rows and Sample Replay Rows
+holdout = is_holdout(ids_new, args.holdout_percent)
+X_new_train, y_new_train = X_new[~holdout], y_new[~holdout]
+num_replay = min(len(state['replay_y']), math.ceil(args.replay_ratio * len(y_new_train)))
+replay = rng.choice(len(state['replay_y']), size=num_replay, replace=False)
+X_tune = np.concatenate([X_new_train, state['replay_X'][replay]])
+y_tune = np.concatenate([y_new_train, state['replay_y'][replay]])
+print(f"Fine-tuning on {len(y_new_train)} new + {num_replay} replay rows, "
+      f"{int(holdout.sum())} new rows held out")
+
+# 5. Fine-tune from the Base Weights
+model = load_model(paths['model'])
+model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=args.learning_rate),
+              loss='binary_crossentropy', metrics=['accuracy'])
+tune_start = time.perf_counter()
+if len(y_tune):
+    model.fit(prepare(scaler, X_tune), y_tune, epochs=args.epochs, batch_size=args.batch_size,
+              shuffle=True, verbose=2)
+tune_seconds = time.perf_counter() - tune_start
+
+# 6. Validate against the Base Version
+X_holdout = np.concatenate([state['holdout_X'], X_new[holdout]])
+y_holdout = np.concatenate([state['holdout_y'], y_new[holdout]])
+validation = {
+    'base': measure(base_model, base_scaler, X_holdout, y_holdout),
+    'candidate': measure(model, scaler, X_holdout, y_holdout),
+    'base_new_cohort': measure(base_model, base_scaler, X_new[holdout], y_new[holdout]),
+    'candidate_new_cohort': measure(model, scaler, X_new[holdout], y_new[holdout]),
+}
+for name, metrics in validation.items():
+    if metrics is not None:
+        print(f"{name:<22} rows={metrics['rows']:<6} accuracy={metrics['accuracy']:.4f} "
+              f"roc_auc={metrics['roc_auc']}")
+
+failures = []
+for metric in ('accuracy', 'roc_auc'):
+    base_value, candidate_value = validation['base'][metric], validation['candidate'][metric]
+    if base_value is not None and candidate_value is not None and candidate_value < base_value - args.max_drop:
+        failures.append(f"{metric} fell from {base_value} to {candidate_value}")
+if failures:
+    raise SystemExit("Candidate rejected, nothing published: " + "; ".join(failures))
+
+# 7. Save and Publish the New Version
+state['seen_ids'] = np.concatenate([state['seen_ids'], ids_new])
+state['holdout_X'], state['holdout_y'] = X_holdout, y_holdout
+state['holdout_ids'] = np.concatenate([state['holdout_ids'], ids_new[holdout]])
+update_reservoir(state, X_new_train, y_new_train, args.replay_size, rng)
+
+with tempfile.TemporaryDirectory() as tmp:
+    files = {
+        'model': os.path.join(tmp, LEGACY_FILES['model']),
+        'scaler': os.path.join(tmp, LEGACY_FILES['scaler']),
+        'training_state': os.path.join(tmp, 'clinical_training_state.npz'),
+    }
+    model.save(files['model'])
+    joblib.dump(scaler, files['scaler'])
+    np.savez(files['training_state'], **state)
+    incremental_seconds = time.perf_counter() - start
+
+    # 8. Compare with a Full Retrain
+    if args.compare_full:
+        full_start = time.perf_counter()
+        X_all, y_all, ids_all = read_rows(args.full_data + args.data)
+        train_rows = ~np.isin(ids_all, state['holdout_ids'])
+        full_scaler = StandardScaler().fit(pd.DataFrame(X_all, columns=feature_names))
+        full_model = tf.keras.models.clone_model(base_model)
+        full_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+        full_model.fit(prepare(full_scaler, X_all[train_rows]), y_all[train_rows],
+                       epochs=args.full_epochs, batch_size=args.batch_size, verbose=0)
+        full_seconds = time.perf_counter() - full_start
+        validation['full_retrain'] = measure(full_model, full_scaler, X_holdout, y_holdout)
+        full_estimated = False
+    else:
+        full_seconds, full_estimated = last_full_retrain(int(state['replay_seen'])), True
+
+    version = publish(MODEL_NAME, files, activate=args.activate, metadata={
+        'mode': 'incremental',
+        'base_version': base_version or 'legacy',
+        'new_rows': int(len(ids_new)),
+        'new_train_rows': int(len(y_new_train)),
+        'new_holdout_rows': int(holdout.sum()),
+        'replay_rows': int(num_replay),
+        'epochs': args.epochs,
+        'learning_rate': args.learning_rate,
+        'validation': validation,
+        'incremental_seconds': round(incremental_seconds, 2),
+        'training_rows': int(state['replay_seen']),
+        'full_retrain_seconds': round(full_seconds, 2) if full_seconds is not None else None,
+        'full_retrain_estimated': full_estimated,
+    })
+
+# 9. Report
+print(f"\nIncremental update: {incremental_seconds:.1f}s (fine-tune {tune_seconds:.1f}s)")
+if full_seconds is None:
+    print("Full retrain: not measured yet, run with --compare-full once to compare")
+else:
+    print(f"Full retrain{' (estimated from the last measured one)' if full_estimated else ''}: "
+          f"{full_seconds:.1f}s, {full_seconds / incremental_seconds:.1f}x the incremental time")
+if 'full_retrain' in validation:
+    print(f"Full retrain holdout accuracy={validation['full_retrain']['accuracy']:.4f} "
+          f"roc_auc={validation['full_retrain']['roc_auc']}")
+print(f" Published {MODEL_NAME} {version}{' (active)' if args.activate else ''}")
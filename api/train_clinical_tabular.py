@@ -0,0 +1,83 @@
+# train_clinical_tabular.py
+#
+# Train a TensorFlow-free clinical model on the same data and split as
+# train_clinical_model.py, and export it to a NumPy-only .npz file that
+# predict_clinical.py can serve with CLINICAL_MODEL_KIND=tabular.
+#
+#   python train_clinical_tabular.py --family logistic
+#   python train_clinical_tabular.py --family gbt --publish --activate
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import GradientBoostingClassifier
+from clinical_features import feature_names, DATASET_PATH, TARGET_COLUMN
+from tabular_model import export_linear, export_gradient_boosting
+
+parser = argparse.ArgumentParser(description='Train a NumPy-only clinical model')
+parser.add_argument('--family', choices=['logistic', 'gbt'], default='logistic')
+parser.add_argument('--output', default='clinical_tabular_model.npz')
+parser.add_argument('--C', type=float, default=1.0, help='Inverse L2 strength for logistic')
+parser.add_argument('--trees', type=int, default=150)
+parser.add_argument('--max-depth', type=int, default=3)
+parser.add_argument('--learning-rate', type=float, default=0.1)
+parser.add_argument('--publish', action='store_true',
+                    help="Publish the exported model to the registry as 'clinical-tabular'")
+parser.add_argument('--activate', action='store_true', help='Make the published version active')
+args = parser.parse_args()
+
+# 1. Load Dataset
+df = pd.read_excel(DATASET_PATH)
+
+# 2. Handle Missing Values
+for col in feature_names:
+    df[col] = df[col].fillna(df[col].mean())
+
+# 3. Separate Features and Target
+X = df[feature_names].to_numpy(dtype=np.float64)
+y = df[TARGET_COLUMN].to_numpy()
+
+# 4. Train-Test Split (same split as the CNN)
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+print(f"Training samples: {X_train.shape[0]}, Testing samples: {X_test.shape[0]}")
+
+# 5. Train and Export
+start = time.perf_counter()
+if args.family == 'logistic':
+    scaler = StandardScaler().fit(X_train)
+    classifier = LogisticRegression(C=args.C, max_iter=1000)
+    classifier.fit(scaler.transform(X_train), y_train)
+    model = export_linear(scaler, classifier)
+    reference = classifier.predict_proba(scaler.transform(X_test))[:, 1]
+else:
+    classifier = GradientBoostingClassifier(n_estimators=args.trees, max_depth=args.max_depth,
+                                            learning_rate=args.learning_rate, random_state=42)
+    classifier.fit(X_train, y_train)
+    model = export_gradient_boosting(classifier, X_train[0])
+    reference = classifier.predict_proba(X_test)[:, 1]
+print(f"Trained {args.family} in {time.perf_counter() - start:.2f}s")
+
+# 6. Check the exported model matches scikit-learn
+exported = model.predict_proba(X_test)
+max_diff = float(np.max(np.abs(exported - reference)))
+print(f"Max difference from scikit-learn: {max_diff:.2e}")
+if max_diff > 1e-4:
+    raise SystemExit("Exported model does not match the trained model")
+
+# 7. Evaluate Model
+test_acc = float(np.mean((exported >= 0.5).astype(int) == y_test))
+print(f" Test Accuracy: {test_acc:.2f}")
+
+# 8. Save Model
+model.save(args.output)
+print(f" Tabular model saved as '{args.output}' ({model.nbytes} bytes of parameters)")
+
+if args.publish:
+    from model_registry import publish
+    version = publish('clinical-tabular', {'model': args.output}, activate=args.activate,
+                      metadata={'family': args.family, 'test_accuracy': round(test_acc, 4)})
+    print(f" Published clinical-tabular {version}{' (active)' if args.activate else ''}")
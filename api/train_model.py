@@ -1,5 +1,8 @@
 # 1. Import Libraries
 import os
+import sys
+import json
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import tensorflow as tf
@@ -10,10 +13,51 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 #from tensorflow.keras.callbacks import EarlyStopping
 from models.model_definitions import build_cnn_model, build_cnn_rnn_model, build_cnn_lstm_model
+from models.training_performance import (
+    build, compile_model, to_float32, profiler_callback, EpochThroughput, Float32Checkpoint
+)
 
+# Usage:
+#   python train_model.py --model cnn
+#   python train_model.py --model cnn --jit --precision auto --accumulate 4
+#   python train_model.py --model cnn --profile-batches 5,10 --log-dir logs/profile
+#   python train_model.py --model cnn_lstm --compare --epochs 3 --steps-per-epoch 20
+
+BUILDERS = {
+    'cnn': build_cnn_model,
+    'cnn_rnn': build_cnn_rnn_model,
+    'cnn_lstm': build_cnn_lstm_model,
+}
+
+# Configurations run by --compare, each against the plain baseline
+COMPARE_CONFIGS = [
+    ('baseline', {}),
+    ('xla', {'jit': True}),
+    ('bfloat16', {'precision': 'bfloat16'}),
+    ('accumulate', {'accumulate': 4}),
+    ('xla+bfloat16', {'jit': True, 'precision': 'bfloat16'}),
+]
+
+parser = argparse.ArgumentParser(description='Train an ECG image model')
+parser.add_argument('--model', choices=list(BUILDERS), default='cnn')
+parser.add_argument('--epochs', type=int, help='Training epochs (default: 30, or 3 with --compare)')
+parser.add_argument('--batch-size', type=int, default=32)
+parser.add_argument('--steps-per-epoch', type=int,
+                    help='Full batches per epoch, cycling through the data (default: one pass over the data)')
+parser.add_argument('--jit', action='store_true', help='Compile the training step with XLA')
+parser.add_argument('--precision', choices=['float32', 'bfloat16', 'auto'], default='float32',
+                    help="'auto' uses bfloat16 mixed precision only if the CPU supports it")
+parser.add_argument('--accumulate', type=int, default=1,
+                    help='Batches to accumulate gradients over (effective batch = batch size x this)')
+parser.add_argument('--profile-batches', help='Record a profiler trace of batches "start,end" (view in TensorBoard)')
+parser.add_argument('--log-dir', default=os.path.join('logs', 'profile'))
+parser.add_argument('--compare', action='store_true',
+                    help='Train briefly with each option and report throughput against the baseline')
+parser.add_argument('--report', default='training_performance_report.json')
+args = parser.parse_args()
 
 # 2. Set Up Paths
-base_dir = r'C:\Users\shrey\OneDrive\Desktop\gestational-health-advise-github\gestational-health-advise-main\api\dataset'
+base_dir = 'dataset'
 
 train_dir = os.path.join(base_dir, 'train')
 validation_dir = os.path.join(base_dir, 'validation')
@@ -21,8 +65,10 @@ test_dir = os.path.join(base_dir, 'test')
 
 # 3. Data Preprocessing
 img_height, img_width = 224, 224
-batch_size = 32
+batch_size = args.batch_size
 num_classes = 2
+input_shape = (img_height, img_width, 3)
+epochs = args.epochs or (3 if args.compare else 30)
 
 train_datagen = ImageDataGenerator(rescale=1./255)
 validation_datagen = ImageDataGenerator(rescale=1./255)
@@ -35,11 +81,15 @@ train_generator = train_datagen.flow_from_directory(
     class_mode='categorical'
 )
 
+# Same class columns as training even if a split is missing a class folder
+classes = sorted(train_generator.class_indices, key=train_generator.class_indices.get)
+
 validation_generator = validation_datagen.flow_from_directory(
     validation_dir,
     target_size=(img_height, img_width),
     batch_size=batch_size,
-    class_mode='categorical'
+    class_mode='categorical',
+    classes=classes
 )
 
 test_generator = test_datagen.flow_from_directory(
@@ -47,38 +97,100 @@ test_generator = test_datagen.flow_from_directory(
     target_size=(img_height, img_width),
     batch_size=batch_size,
     class_mode='categorical',
+    classes=classes,
     shuffle=False
 )
 
-# 4. Choose Model
-# Uncomment the model you want to use
-
-model = build_cnn_model(input_shape=(img_height, img_width, 3), num_classes=num_classes)
-#model = build_cnn_rnn_model(input_shape=(img_height, img_width, 3), num_classes=num_classes)
-#model = build_cnn_lstm_model(input_shape=(img_height, img_width, 3), num_classes=num_classes)
+if args.steps_per_epoch:
+    if train_generator.samples < batch_size:
+        sys.exit(f"--steps-per-epoch needs at least one full batch of {batch_size} training images; "
+                 f"lower --batch-size")
+    images_per_epoch = args.steps_per_epoch * batch_size
+else:
+    images_per_epoch = train_generator.samples
+
+def repeat_batches(iterator):
+    """
+    Cycle through the full training batches so --steps-per-epoch can exceed one
+    pass over the data. The short last batch is skipped: every step has the same
+    shape (no XLA recompiles) and images_per_epoch counts what was trained on.
+    """
+    while True:
+        for i in range(len(iterator)):
+            batch = iterator[i]
+            if len(batch[0]) == iterator.batch_size:
+                yield batch
+        iterator.on_epoch_end()
 
-# 5. Compile the Model
-model.compile(
-    optimizer='adam',
-    loss='categorical_crossentropy',
-    metrics=['accuracy']
-)
-
-# 6. Setup Callbacks
-early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
-checkpoint = ModelCheckpoint('diabetes_cnn_model.keras', monitor='val_loss', save_best_only=True)
-
-# 7. Train the Model
-history = model.fit(
-    train_generator,
-    epochs=30,
-    validation_data=validation_generator,
-    callbacks=[early_stop, checkpoint]
-
-)
-
-# 8. Save the Final Model
-model.save('diabetes_cnn_model_final.keras')
+# 4. Choose Model
+builder = BUILDERS[args.model]
+
+def train(jit=False, precision='float32', accumulate=1, profile_batches=None, validate=True):
+    """Build, compile and fit one model; returns (model, policy, history, throughput callback)"""
+    tf.keras.backend.clear_session()
+    model, policy = build(builder, input_shape, num_classes, precision)
+
+    # 5. Compile the Model
+    compile_model(model, jit_compile=jit, accumulation_steps=accumulate)
+
+    # 6. Setup Callbacks
+    throughput = EpochThroughput(images_per_epoch)
+    callbacks = [throughput]
+    if validate:
+        early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+        if policy == 'float32':
+            checkpoint = ModelCheckpoint('diabetes_cnn_model.keras', monitor='val_loss', save_best_only=True)
+        else:
+            # Serving expects a float32 model whatever the training precision
+            checkpoint = Float32Checkpoint('diabetes_cnn_model.keras', builder, input_shape, num_classes,
+                                           monitor='val_loss')
+        callbacks += [early_stop, checkpoint]
+    if profile_batches:
+        callbacks.append(profiler_callback(args.log_dir, profile_batches))
+
+    # 7. Train the Model
+    history = model.fit(
+        repeat_batches(train_generator) if args.steps_per_epoch else train_generator,
+        epochs=epochs,
+        steps_per_epoch=args.steps_per_epoch,
+        validation_data=validation_generator if validate else None,
+        callbacks=callbacks
+    )
+    return model, policy, history, throughput
+
+if args.compare:
+    # Compare training throughput of each option; validation (and with it
+    # checkpointing) is skipped so only training is timed
+    results = []
+    for name, options in COMPARE_CONFIGS:
+        print(f"\n=== {name} ===")
+        _, policy, _, throughput = train(validate=False, **options)
+        results.append(dict(throughput.summary(), config=name, policy=policy, **options))
+    tf.keras.mixed_precision.set_global_policy('float32')
+
+    baseline = results[0]['steady_images_per_second']
+    print(f"\n{args.model}: batch {batch_size}, {images_per_epoch} images per epoch, {epochs} epochs")
+    print(f"{'config':<16}{'policy':<16}{'1st epoch s':>13}{'images/s':>11}{'vs baseline':>13}")
+    for r in results:
+        r['speedup'] = round(r['steady_images_per_second'] / baseline, 2) if baseline else None
+        print(f"{r['config']:<16}{r['policy']:<16}{r['first_epoch_seconds']:>13}"
+              f"{r['steady_images_per_second']:>11}{r['speedup']:>12}x")
+    with open(args.report, 'w') as f:
+        json.dump({'model': args.model, 'batch_size': batch_size, 'epochs': epochs,
+                   'images_per_epoch': images_per_epoch, 'results': results}, f, indent=2)
+    print(f"Report written to {args.report}")
+    sys.exit(0)
+
+model, policy, history, throughput = train(args.jit, args.precision, args.accumulate, args.profile_batches)
+print(f"Precision policy: {policy}, XLA: {args.jit}, effective batch size: {batch_size * args.accumulate}")
+if args.profile_batches:
+    print(f"Profiler trace written to {args.log_dir} (tensorboard --logdir {args.log_dir})")
+summary = throughput.summary()
+print(f"First epoch: {summary['first_epoch_seconds']}s, "
+      f"later epochs: {summary['steady_images_per_second']} images/s")
+
+# 8. Save the Final Model (float32 for serving)
+to_float32(model, builder, input_shape, num_classes).save('diabetes_cnn_model_final.keras')
 
 # 9. Evaluate the Model on Test Data
 test_loss, test_accuracy = model.evaluate(test_generator)
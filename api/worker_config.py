@@ -0,0 +1,171 @@
+# worker_config.py
+#
+# CPU budget for the inference workers. TensorFlow, OpenMP and oneDNN each
+# size their thread pools to every core on the host by default, so several
+# workers per host oversubscribe the CPU. configure_worker() detects the cores
+# this process may use (affinity mask and cgroup CPU quota), splits them
+# between the workers and sizes the thread pools of this worker to its share.
+# It has to run before TensorFlow is imported. Nothing is changed unless the
+# split is asked for (serve.py, WORKER_COUNT or WORKER_THREADS); a plain single
+# process keeps the TensorFlow and OpenMP defaults.
+#
+#   WORKER_COUNT            worker processes sharing this host (default 1)
+#   WORKER_THREADS          threads per worker (default: the budget divided by WORKER_COUNT)
+#   WORKER_INTEROP_THREADS  TensorFlow inter-op threads (default 1)
+#   WORKER_INDEX            index of this worker, set by serve.py
+#   WORKER_PIN              1 to pin each worker to its own set of cores
+#
+#   python worker_config.py --workers 4     # show the detected budget and the split
+
+import os
+import sys
+import json
+import math
+import logging
+import argparse
+
+logger = logging.getLogger('worker-config')
+
+# Thread-count variables read by TensorFlow, OpenMP (oneDNN in OpenMP builds) and BLAS
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS')
+
+# Setting any of these opts the process in to the CPU budget
+BUDGET_ENV_VARS = ('WORKER_COUNT', 'WORKER_THREADS', 'WORKER_INTEROP_THREADS')
+
+_applied = None
+
+def available_cores():
+    """CPUs this process may run on, from its affinity mask where the OS has one"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def cgroup_cpu_quota(root='/sys/fs/cgroup'):
+    """CPU limit in cores from cgroup v2 cpu.max or the v1 CFS quota; None when unlimited"""
+    try:
+        with open(os.path.join(root, 'cpu.max')) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == 'max' else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(root, 'cpu', 'cpu.cfs_quota_us')) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, 'cpu', 'cpu.cfs_period_us')) as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def cpu_budget():
+    """(cores, count): the usable cores and how many of them the cgroup quota lets us keep busy"""
+    cores = available_cores()
+    quota = cgroup_cpu_quota()
+    # Round a fractional quota down; threads beyond it only get throttled
+    count = len(cores) if quota is None else max(1, min(len(cores), math.floor(quota)))
+    return cores, count
+
+def plan(workers=None, threads=None, pin=False, inter_op_threads=None):
+    """
+    Split the CPU budget into workers x threads per worker. When only one of
+    them is given the other fills the budget; core_sets lists the cores each
+    worker is pinned to when pin is set.
+    """
+    cores, budget = cpu_budget()
+    workers = max(1, workers or 1)
+    threads = max(1, threads or budget // workers)
+    core_sets = None
+    if pin:
+        usable = cores[:budget]
+        core_sets = [sorted({usable[(i * threads + j) % len(usable)] for j in range(threads)})
+                     for i in range(workers)]
+    return {
+        'cores_available': len(cores),
+        'cgroup_quota': cgroup_cpu_quota(),
+        'cpu_budget': budget,
+        'workers': workers,
+        'threads_per_worker': threads,
+        'inter_op_threads': max(1, inter_op_threads or 1),
+        'oversubscribed': workers * threads > budget,
+        'core_sets': core_sets,
+    }
+
+def candidate_splits(budget=None):
+    """Every workers x threads split that exactly fills the budget, e.g. 1x8, 2x4, 4x2, 8x1"""
+    if budget is None:
+        budget = cpu_budget()[1]
+    return [(workers, budget // workers) for workers in range(1, budget + 1) if budget % workers == 0]
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def worker_index():
+    return int(os.getenv('WORKER_INDEX', '0'))
+
+def configure_worker():
+    """
+    Size this process's thread pools from the WORKER_* settings and pin it if
+    asked. Without WORKER_COUNT/WORKER_THREADS nothing is changed. Variables
+    that are already set explicitly are left alone. Safe to call more than
+    once; returns the applied settings.
+    """
+    global _applied
+    if _applied is not None:
+        return _applied
+
+    if not any(os.getenv(name) for name in BUDGET_ENV_VARS):
+        cores, budget = cpu_budget()
+        _applied = {
+            'budgeted': False,
+            'cores_available': len(cores),
+            'cgroup_quota': cgroup_cpu_quota(),
+            'cpu_budget': budget,
+            'worker_index': worker_index(),
+            'pinned_cores': None,
+        }
+        return _applied
+
+    settings = plan(workers=_env_int('WORKER_COUNT'), threads=_env_int('WORKER_THREADS'),
+                    pin=os.getenv('WORKER_PIN') == '1',
+                    inter_op_threads=_env_int('WORKER_INTEROP_THREADS'))
+    settings['budgeted'] = True
+    settings['worker_index'] = worker_index()
+    threads = settings['threads_per_worker']
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(settings['inter_op_threads']))
+
+    if 'tensorflow' in sys.modules:
+        # Too late for the environment variables; this works until TensorFlow runs its first op
+        import tensorflow as tf
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(settings['inter_op_threads'])
+        except RuntimeError as e:
+            logger.warning(f"TensorFlow is already initialized, thread pools unchanged: {str(e)}")
+
+    settings['pinned_cores'] = None
+    if settings['core_sets'] and hasattr(os, 'sched_setaffinity'):
+        cores = settings['core_sets'][settings['worker_index'] % settings['workers']]
+        os.sched_setaffinity(0, cores)
+        settings['pinned_cores'] = cores
+
+    _applied = settings
+    return settings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the detected CPU budget and the worker split')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--pin', action='store_true')
+    args = parser.parse_args(argv)
+
+    settings = plan(args.workers, args.threads, args.pin)
+    settings['candidate_splits'] = candidate_splits(settings['cpu_budget'])
+    print(json.dumps(settings, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())